@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Times SCOntology.mutate, SCOntology.serialize, the reloading of the
+output, the end-to-end pipeline on a synthetic specimen export and the CLI
+start-up, and saves throughput, peak RSS and output size as JSON. Every
+measurement runs in a fresh process, so that the peak RSS of one stage does
+not leak into another.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from os.path import abspath, dirname, getsize, join
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, dirname(abspath(__file__)))
+
+import specimen2ccf  # noqa: E402
+from synthetic import generate, count_records  # noqa: E402
+
+ONTOLOGY_IRI = "http://purl.org/ccf/data/benchmark.owl"
+
+
+def bench_mutate(input_file):
+    from specimen2ccf.ontology import SCOntology
+    with open(input_file) as f:
+        data = json.load(f)
+    wall, cpu = time.perf_counter(), time.process_time()
+    o = SCOntology.new(ONTOLOGY_IRI).mutate(data)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return _measurement(wall, cpu, triples=len(o.graph))
+
+
+def bench_serialize(input_file, format):
+    from specimen2ccf.ontology import SCOntology
+    with open(input_file) as f:
+        o = SCOntology.new(ONTOLOGY_IRI).mutate(json.load(f))
+    with tempfile.TemporaryDirectory() as tmp:
+        output = join(tmp, "output." + format)
+        wall, cpu = time.perf_counter(), time.process_time()
+        o.serialize(output, format)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        return _measurement(wall, cpu, triples=len(o.graph),
+                            output_bytes=getsize(output))
+
+
+def bench_load(input_file, format):
+    """Times how long a downstream loader takes to read the output back
+    into an rdflib Graph
+    """
+    from rdflib import Graph
+    from specimen2ccf.binary import load
+    from specimen2ccf.ontology import SCOntology
+    with open(input_file) as f:
+        o = SCOntology.new(ONTOLOGY_IRI).mutate(json.load(f))
+    with tempfile.TemporaryDirectory() as tmp:
+        output = join(tmp, "output." + format)
+        o.serialize(output, format)
+        del o
+        wall, cpu = time.perf_counter(), time.process_time()
+        if format == "binary":
+            graph = load(output)
+        else:
+            graph = Graph().parse(output, format=format)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        return _measurement(wall, cpu, triples=len(graph),
+                            output_bytes=getsize(output))
+
+
+def bench_service(input_file, format):
+    """Times the conversion of every donor as a payload of its own, like
+    the conversion service does per request
+    """
+    from specimen2ccf.service import Converter
+    with open(input_file) as f:
+        payloads = [{"@graph": [donor]} for donor in json.load(f)["@graph"]]
+    wall, cpu = time.perf_counter(), time.process_time()
+    output_bytes = sum(map(len, Converter(ONTOLOGY_IRI).convert_many(
+        payloads, format)))
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return _measurement(wall, cpu, output_bytes=output_bytes)
+
+
+def bench_pipeline(input_file, extra_args):
+    with tempfile.TemporaryDirectory() as tmp:
+        output = join(tmp, "output.owl")
+        measurement = bench_command(
+            [join(ROOT, "bin", "specimen2ccf"), input_file,
+             "--ontology-iri", ONTOLOGY_IRI, "-o", output] + extra_args)
+        measurement["output_bytes"] = getsize(output)
+        return measurement
+
+
+def bench_startup(arguments):
+    """Times a command that does not convert anything, e.g., --version or
+    importing the pipeline module, which is dominated by start-up
+    """
+    return bench_command(arguments)
+
+
+def bench_command(arguments):
+    command = [sys.executable] + arguments
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    wall = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - wall
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError("Command failed: " + " ".join(command))
+    return {"seconds": wall,
+            "cpu_seconds": usage.ru_utime + usage.ru_stime,
+            "peak_rss_kb": usage.ru_maxrss}
+
+
+def _measurement(wall, cpu, **values):
+    values.update({
+        "seconds": wall,
+        "cpu_seconds": cpu,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    })
+    return values
+
+
+def run_isolated(function, *args):
+    """Runs the benchmark function in a fresh interpreter
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=context) as executor:
+        return executor.submit(function, *args).result()
+
+
+def run_case(name, repeat, function, *args):
+    runs = [run_isolated(function, *args) for _ in range(repeat)]
+    best = min(runs, key=lambda run: run["seconds"])
+    print("%-18s %8.3f s %10d KB" % (name, best["seconds"],
+                                     best["peak_rss_kb"]), file=sys.stderr)
+    return dict(best, name=name, runs=[run["seconds"] for run in runs])
+
+
+def compare(results, baseline):
+    previous = {case["name"]: case for case in baseline["results"]}
+    print("%-18s %10s %10s %8s" % ("case", "baseline", "current", "ratio"))
+    for case in results["results"]:
+        old = previous.get(case["name"])
+        if old is None:
+            continue
+        print("%-18s %10.3f %10.3f %8.2f" % (
+            case["name"], old["seconds"], case["seconds"],
+            case["seconds"] / old["seconds"]))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--donors", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=2)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--datasets", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of runs per case, the fastest is kept")
+    parser.add_argument("-o", "--output", default="bench_results.json",
+                        help="JSON file for the results")
+    parser.add_argument("--compare", help="previous results to compare with")
+    args = parser.parse_args()
+
+    records = count_records(args.donors, args.blocks, args.sections,
+                            args.datasets)
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = join(tmp, "input.jsonld")
+        with open(input_file, "w") as f:
+            json.dump(generate(args.donors, args.blocks, args.sections,
+                               args.datasets), f)
+
+        cases = [
+            run_case("mutate", args.repeat, bench_mutate, input_file),
+            run_case("serialize-ttl", args.repeat, bench_serialize,
+                     input_file, "ttl"),
+            run_case("serialize-nt", args.repeat, bench_serialize,
+                     input_file, "nt"),
+            run_case("serialize-nquads", args.repeat, bench_serialize,
+                     input_file, "nquads"),
+            run_case("serialize-binary", args.repeat, bench_serialize,
+                     input_file, "binary"),
+            run_case("load-ttl", args.repeat, bench_load, input_file, "ttl"),
+            run_case("load-nt", args.repeat, bench_load, input_file, "nt"),
+            run_case("load-binary", args.repeat, bench_load,
+                     input_file, "binary"),
+            run_case("service-nt", args.repeat, bench_service,
+                     input_file, "nt"),
+            run_case("pipeline", args.repeat, bench_pipeline,
+                     input_file, []),
+            run_case("pipeline-stream", args.repeat, bench_pipeline,
+                     input_file, ["--stream-input", "--stream-output"]),
+        ]
+
+    triples = cases[0]["triples"]
+    for case in cases:
+        case.setdefault("triples", triples)
+        case["records_per_second"] = records / case["seconds"]
+        case["triples_per_second"] = case["triples"] / case["seconds"]
+
+    cases += [
+        run_case("startup-version", args.repeat, bench_startup,
+                 [join(ROOT, "bin", "specimen2ccf"), "--version"]),
+        run_case("startup-import", args.repeat, bench_startup,
+                 ["-c", "import specimen2ccf.pipeline"]),
+    ]
+
+    results = {
+        "version": specimen2ccf.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "parameters": {"donors": args.donors, "blocks": args.blocks,
+                       "sections": args.sections, "datasets": args.datasets,
+                       "records": records},
+        "results": cases
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Generates synthetic HuBMAP specimen exports for the benchmarks. Each donor
+has a fixed fan-out of tissue blocks, each block has sections and every
+section has datasets, which mirrors the shape of the real `@graph` export.
+"""
+import sys
+import json
+import random
+
+from argparse import ArgumentParser
+
+SEXES = ["Male", "Female", None]
+CONSORTIA = ["HuBMAP", "GTEx", "KPMP"]
+PROVIDERS = ["TMC-Stanford", "TMC-Florida", "TMC-Vanderbilt", "TMC-UCSD"]
+TECHNOLOGIES = ["CODEX", "AF", "IMS", "snRNA-seq", "MxIF", "PAS"]
+
+
+def generate(donors, blocks=2, sections=4, datasets=2, seed=0):
+    """Returns a JSON-LD document with the given number of donors and the
+    given fan-out per donor, tissue block and tissue section
+    """
+    rng = random.Random(seed)
+    base = "https://example.org/hubmap/"
+    graph = []
+    for d in range(donors):
+        donor_id = base + "donor/%d" % d
+        provider = rng.choice(PROVIDERS)
+        donor = {
+            "@id": donor_id,
+            "@type": "Donor",
+            "label": "%s, Age %d" % (rng.choice(["Male", "Female"]),
+                                     rng.randint(18, 90)),
+            "description": "Entered %d by a data curator" % d,
+            "link": donor_id + "/link",
+            "age": rng.randint(18, 90),
+            "bmi": round(rng.uniform(17.0, 40.0), 1),
+            "consortium_name": rng.choice(CONSORTIA),
+            "provider_name": provider,
+            "provider_uuid": "%032x" % rng.getrandbits(128),
+            "samples": []
+        }
+        sex = rng.choice(SEXES)
+        if sex is not None:
+            donor["sex"] = sex
+        for b in range(blocks):
+            block_id = "%s/block/%d" % (donor_id, b)
+            block = {
+                "@id": block_id,
+                "@type": "Sample",
+                "sample_type": "Tissue Block",
+                "label": "Registered %d/%d" % (d, b),
+                "description": "%d x %d x %d millimeter, 10 millimeter" % (
+                    rng.randint(1, 20), rng.randint(1, 20),
+                    rng.randint(1, 20)),
+                "link": block_id + "/link",
+                "section_count": sections,
+                "section_size": rng.choice([4, 10, 20]),
+                "section_units": "millimeter",
+                "rui_location": {"@id": block_id + "/rui_location"},
+                "sections": [],
+                "datasets": []
+            }
+            for s in range(sections):
+                section_id = "%s/section/%d" % (block_id, s)
+                block["sections"].append({
+                    "@id": section_id,
+                    "@type": "Sample",
+                    "sample_type": "Tissue Section",
+                    "label": "Section %d" % s,
+                    "description": "Section of block %d" % b,
+                    "link": section_id + "/link",
+                    "section_number": s + 1,
+                    "datasets": [_dataset(rng, section_id, k)
+                                 for k in range(datasets)]
+                })
+            block["datasets"].append(_dataset(rng, block_id, 0))
+            donor["samples"].append(block)
+        graph.append(donor)
+    return {"@context": "https://hubmap-link-api.herokuapp.com/context.jsonld",
+            "@graph": graph}
+
+
+def count_records(donors, blocks=2, sections=4, datasets=2):
+    """Returns the number of entities (donors, tissue blocks, sections and
+    datasets) in a generated export
+    """
+    block_count = donors * blocks
+    section_count = block_count * sections
+    return donors + block_count + section_count + \
+        block_count + section_count * datasets
+
+
+def _dataset(rng, sample_id, k):
+    dataset_id = "%s/dataset/%d" % (sample_id, k)
+    return {
+        "@id": dataset_id,
+        "label": "Dataset %d" % k,
+        "description": "Generated dataset",
+        "link": dataset_id + "/link",
+        "technology": rng.choice(TECHNOLOGIES),
+        "thumbnail": "assets/icons/ico-unknown.svg"
+    }
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--donors", type=int, default=100)
+    parser.add_argument("--blocks", type=int, default=2)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--datasets", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    data = generate(args.donors, args.blocks, args.sections, args.datasets,
+                    args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(data, f)
+    else:
+        json.dump(data, sys.stdout)
@@ -11,10 +11,11 @@ License :: OSI Approved :: BSD License
 Intended Audience :: Science/Research
 Topic :: Scientific/Engineering
 Topic :: Scientific/Engineering :: Bio-Informatics
-Programming Language :: Python :: 3.5
-Programming Language :: Python :: 3.6
 Programming Language :: Python :: 3.7
 Programming Language :: Python :: 3.8
+Programming Language :: Python :: 3.9
+Programming Language :: Python :: 3.10
+Programming Language :: Python :: 3.11
 Operating System :: POSIX :: Linux
 """.strip().split('\n')
 
@@ -30,9 +31,14 @@ setup(name='specimen2ccf',
           'rdflib==5.0.0',
           'requests_file==1.5.1'
       ],
-      python_requires='>=3.5',
+      extras_require={
+          'jsonld': ['rdflib-jsonld'],
+          'tables': ['pyarrow'],
+          'zstd': ['zstandard']
+      },
+      python_requires='>=3.7',
       test_suite='nose.collector',
       tests_require=['nose'],
-      packages=find_packages(),
+      packages=find_packages(exclude=['tests']),
       include_package_data=True,
       scripts=['bin/specimen2ccf'])
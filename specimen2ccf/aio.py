@@ -0,0 +1,195 @@
+import asyncio
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+
+from specimen2ccf.chunks import iter_chunks
+from specimen2ccf.ontology import SCOntology
+from specimen2ccf.pipeline import open_graph, open_output, batch_size, \
+    new_index, read_records, screen_records, convert_records, \
+    add_converted, write_output, open_fetch, is_local, graph_name
+from specimen2ccf.writer import new_writer
+
+
+# Number of items waiting between two stages, e.g., downloads in flight or
+# decoded chunks of records, after which the upstream stage waits
+QUEUE_SIZE = 4
+
+_DONE = object()
+
+
+async def run_async(args, cache_dir, instrumentation, tables):
+    """Runs the conversion as a pipeline of concurrent stages connected by
+    bounded queues: the inputs are fetched, decoded into chunks of donor
+    records, converted into triples and written, so that the download of
+    the next input overlaps the conversion of the current one. The bounded
+    queues hold back a stage that gets ahead of the next one.
+    """
+    if args.incremental or args.shard_by:
+        raise ValueError("The asynchronous pipeline cannot be combined with "
+                         "incremental mode or sharded output")
+    fetch = None
+    if not all(is_local(url) for url in args.input_file):
+        fetch = open_fetch(cache_dir, args)
+    paths = asyncio.Queue(QUEUE_SIZE)
+    chunks = asyncio.Queue(QUEUE_SIZE)
+    stages = [
+        _fetch_stage(args.input_file, fetch, paths),
+        _decode_stage(paths, chunks, args.chunk_size, args.stream_input)
+    ]
+    if args.stream_output:
+        with open_output(args) as stream:
+            writer = new_writer(args.format, stream, graph_name(args))
+            o = SCOntology.new(args.ontology_iri, writer, instrumentation,
+                               batch_size(args), tables, args.on_invalid,
+                               new_index(args))
+            await _run_stages(*stages, _mutate(o, chunks, args.jobs))
+            write_output(o, args, stream)
+    else:
+        graph = open_graph(args)
+        try:
+            o = SCOntology.new(args.ontology_iri, graph, instrumentation,
+                               batch_size(args), tables, args.on_invalid,
+                               new_index(args))
+            await _run_stages(*stages, _mutate(o, chunks, args.jobs))
+            write_output(o, args)
+        finally:
+            graph.close(commit_pending_transaction=True)
+
+
+async def mutate_async(o, chunks, executor=None, queue_size=QUEUE_SIZE):
+    """Mutates the ontology with the chunks of donor records of the given
+    iterable or async iterable, e.g., from an async service. The chunks
+    are converted into triples in the executor, at most queue_size of them
+    ahead of the triples being added to the ontology, which happens in a
+    thread of its own, thus the event loop is not blocked. The triples are
+    added on the event loop only for a transactional store, whose
+    connection belongs to the thread that opened it.
+    """
+    results = asyncio.Queue(queue_size)
+    adding = nullcontext() if o.transactional else ThreadPoolExecutor(1)
+    with adding as add_executor:
+        await _run_stages(_convert_stage(o, chunks, results, executor),
+                          _write_stage(o, results, add_executor))
+    return o
+
+
+async def convert_async(data, ontology_iri, format='ttl', executor=None):
+    """Converts a JSON-LD specimen payload in the executor and returns the
+    ontology, encoded in the given format, as bytes
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, _convert, data, ontology_iri,
+                                      format)
+
+
+@lru_cache(maxsize=16)
+def _converter(ontology_iri):
+    from specimen2ccf.service import Converter
+    return Converter(ontology_iri)
+
+
+def _convert(data, ontology_iri, format):
+    return _converter(ontology_iri).convert(data, format)
+
+
+async def _mutate(o, queue, jobs):
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs) as executor:
+            await mutate_async(o, _drain(queue), executor, 2 * jobs)
+    else:
+        await mutate_async(o, _drain(queue))
+
+
+async def _run_stages(*stages):
+    """Runs the stages concurrently until all are done, cancelling the
+    others once one of them fails
+    """
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def _drain(queue):
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        yield item
+
+
+async def _iterate(items):
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def _fetch_stage(urls, fetch, queue):
+    """Starts the download of every remote input and queues the pending
+    downloads in input order, so that at most as many are in flight as the
+    queue holds
+    """
+    loop = asyncio.get_running_loop()
+    for url in urls:
+        if is_local(url):
+            path = loop.create_future()
+            path.set_result(url)
+        else:
+            path = loop.run_in_executor(None, fetch, url)
+        await queue.put(path)
+    await queue.put(_DONE)
+
+
+async def _decode_stage(paths, queue, chunk_size, stream_input):
+    """Decodes every fetched input into chunks of donor records in a thread
+    """
+    loop = asyncio.get_running_loop()
+    async for path in _drain(paths):
+        chunks = iter_chunks(read_records([await path], stream_input),
+                             chunk_size)
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                break
+            await queue.put(chunk)
+    await queue.put(_DONE)
+
+
+async def _convert_stage(o, chunks, queue, executor):
+    """Converts every chunk into triples in the executor and queues the
+    pending conversions in order. The records are screened against the
+    entity index of the ontology first, like in mutate_parallel.
+    """
+    loop = asyncio.get_running_loop()
+    async for chunk in _iterate(chunks):
+        decisions = None
+        if o.index is not None:
+            chunk, decisions = screen_records(o, chunk)
+        await queue.put(loop.run_in_executor(
+            executor, convert_records, chunk, o.instrumentation.enabled,
+            o.tables is not None, o.on_invalid, decisions))
+    await queue.put(_DONE)
+
+
+async def _write_stage(o, queue, executor):
+    """Adds the converted triples and table rows to the ontology in the
+    executor, if any, in the order of the chunks
+    """
+    loop = asyncio.get_running_loop()
+    async for result in _drain(queue):
+        triples, report, rows = await result
+        if executor is None:
+            add_converted(o, triples, rows)
+        else:
+            await loop.run_in_executor(executor, add_converted, o, triples,
+                                       rows)
+        if report is not None:
+            o.instrumentation.merge(report)
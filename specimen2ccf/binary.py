@@ -0,0 +1,139 @@
+import sys
+import json
+import struct
+
+from array import array
+from contextlib import nullcontext
+from rdflib import Graph, URIRef
+from rdflib.parser import Parser
+
+from specimen2ccf.terms import encode_term, decode_term
+from specimen2ccf.writer import TripleWriter
+
+
+# Leading bytes of every binary document, including the format version
+MAGIC = b'SCRDF\x01\n'
+
+# Byte length of the term table and number of term ids of a frame
+FRAME = struct.Struct('<II')
+
+# Number of triples per frame
+FRAME_SIZE = 65536
+
+
+class BinaryWriter(TripleWriter):
+    """Binary RDF Writer
+    Writes a compact, dictionary-encoded document that is loaded without
+    parsing any RDF syntax. The document is a sequence of frames, each of
+    them with a JSON table of the distinct terms of the frame and the
+    triples of the frame as little-endian 32-bit indexes into that table.
+    As each frame has its own table, the memory use of the writer stays
+    flat and the frames can be decoded independently.
+    """
+    def __init__(self, stream, frame_size=FRAME_SIZE):
+        self.stream = stream
+        self.namespaces = {}
+        self.count = 0
+        self.frame_size = frame_size
+        self.bindings = []
+        self.ids = {}
+        self.terms = []
+        self.triples = array('I')
+        stream.write(MAGIC)
+
+    def bind(self, prefix, namespace):
+        super().bind(prefix, namespace)
+        self.bindings.append((prefix, str(namespace)))
+
+    def add(self, triple):
+        ids = self.ids
+        for term in triple:
+            id = ids.get(term)
+            if id is None:
+                id = ids[term] = len(self.terms)
+                self.terms.append(encode_term(term))
+            self.triples.append(id)
+        self.count += 1
+        if len(self.triples) >= 3 * self.frame_size:
+            self._write_frame()
+
+    def serialize(self, destination=None, format=None, **kwargs):
+        if self.triples or self.bindings:
+            self._write_frame()
+        self.stream.flush()
+
+    def _write_frame(self):
+        table = json.dumps({'namespaces': self.bindings, 'terms': self.terms},
+                           ensure_ascii=False, separators=(',', ':'))
+        table = table.encode('utf-8')
+        if sys.byteorder == 'big':
+            self.triples.byteswap()
+        self.stream.write(FRAME.pack(len(table), len(self.triples)))
+        self.stream.write(table)
+        self.stream.write(self.triples.tobytes())
+        self.bindings = []
+        self.ids = {}
+        self.terms = []
+        self.triples = array('I')
+
+
+class BinaryReader:
+    """Binary RDF Reader
+    Iterates over the triples of a binary document read from a binary file
+    object. The namespace bindings are collected while reading.
+    """
+    def __init__(self, fp):
+        self.fp = fp
+        self.namespaces = []
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a binary specimen2ccf document")
+
+    def __iter__(self):
+        while True:
+            header = self.fp.read(FRAME.size)
+            if not header:
+                return
+            length, count = FRAME.unpack(self._complete(header, FRAME.size))
+            table = json.loads(self._read(length).decode('utf-8'))
+            self.namespaces.extend(table['namespaces'])
+            terms = [decode_term(key) for key in table['terms']]
+            ids = array('I', self._read(4 * count))
+            if sys.byteorder == 'big':
+                ids.byteswap()
+            iterator = map(terms.__getitem__, ids)
+            yield from zip(iterator, iterator, iterator)
+
+    def _read(self, size):
+        return self._complete(self.fp.read(size), size)
+
+    def _complete(self, data, size):
+        if len(data) != size:
+            raise ValueError("Truncated binary specimen2ccf document")
+        return data
+
+
+class BinaryParser(Parser):
+    """rdflib parser plugin of the binary format, i.e.,
+    graph.parse(path, format='specimen2ccf-binary')
+    """
+    def parse(self, source, sink, **args):
+        load(source.getByteStream(), sink)
+
+
+def load(source, graph=None):
+    """Loads a binary document, given as a path or a binary file object,
+    into the graph, which is a new in-memory Graph if none is given, and
+    returns the graph
+    """
+    if graph is None:
+        graph = Graph()
+    if isinstance(source, str):
+        context = open(source, 'rb')
+    else:
+        context = nullcontext(source)
+    with context as fp:
+        reader = BinaryReader(fp)
+        graph.addN((s, p, o, graph) for s, p, o in reader)
+        for prefix, namespace in reader.namespaces:
+            graph.bind(prefix, URIRef(namespace))
+    return graph
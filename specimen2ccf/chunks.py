@@ -0,0 +1,14 @@
+from itertools import islice
+
+
+def iter_chunks(iterable, size):
+    """Yields the items of the iterable in lists of the given size, the
+    last of which may be shorter
+    """
+    if size < 1:
+        raise ValueError("Invalid chunk size <%d>" % size)
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
@@ -0,0 +1,53 @@
+import sys
+import gzip
+
+from contextlib import nullcontext
+
+
+COMPRESSIONS = ('gzip', 'zstd')
+
+
+def open_writer(path, compression=None):
+    """Opens the file at the given path, or the standard output if no path
+    is given, as a binary stream that compresses the data while it is
+    written
+    """
+    if compression is None:
+        if path is None:
+            return nullcontext(sys.stdout.buffer)
+        return open(path, 'wb')
+    if compression == 'gzip':
+        if path is None:
+            return gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb')
+        return gzip.open(path, 'wb')
+    if compression == 'zstd':
+        compressor = import_zstandard().ZstdCompressor()
+        if path is None:
+            return compressor.stream_writer(sys.stdout.buffer, closefd=False)
+        return compressor.stream_writer(open(path, 'wb'))
+    raise ValueError("Unsupported compression <" + compression + ">")
+
+
+def open_reader(path, compression=None):
+    """Opens the file at the given path as a binary stream that decompresses
+    the data while it is read
+    """
+    if compression is None:
+        return open(path, 'rb')
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        decompressor = import_zstandard().ZstdDecompressor()
+        return decompressor.stream_reader(open(path, 'rb'))
+    raise ValueError("Unsupported compression <" + compression + ">")
+
+
+def import_zstandard():
+    """Returns the optional zstandard module
+    """
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression requires the zstandard "
+                          "package") from None
+    return zstandard
@@ -0,0 +1,86 @@
+import logging
+
+from specimen2ccf.hierarchy import walk
+from specimen2ccf.incremental import content_hash
+
+
+logger = logging.getLogger(__name__)
+
+FIRST = 'first'
+MERGE = 'merge'
+ERROR = 'error'
+
+POLICIES = (FIRST, MERGE, ERROR)
+
+# Keys of the nested entities, which are indexed on their own
+NESTED_KEYS = frozenset(('samples', 'sections', 'datasets'))
+
+
+class DuplicateEntityError(ValueError):
+    """Raised for an entity that was already converted with other values
+    """
+    def __init__(self, iri):
+        self.iri = iri
+        super().__init__("Conflicting versions of entity <%s>" % iri)
+
+    def __reduce__(self):
+        return DuplicateEntityError, (self.iri,)
+
+
+class EntityIndex:
+    """Entity Index
+    Maps the IRI of every converted donor, tissue block, tissue section and
+    dataset to a content hash of its own fields and its parent. A repeat
+    with the same hash is skipped, and a conflicting repeat is resolved by
+    the policy: 'first' keeps the first version, 'merge' adds the values of
+    every version, and 'error' raises DuplicateEntityError.
+    """
+    def __init__(self, policy=FIRST):
+        if policy not in POLICIES:
+            raise ValueError("Unsupported duplicate policy <" + policy + ">")
+        self.policy = policy
+        self.hashes = {}
+        self.repeats = 0
+        self.conflicts = 0
+
+    def admit(self, obj, parent_iri):
+        """Returns whether the triples of the entity should be added
+        """
+        iri = obj['@id']
+        fields = {key: value for key, value in obj.items()
+                  if key not in NESTED_KEYS}
+        parent = None if parent_iri is None else str(parent_iri)
+        digest = content_hash([parent, fields])
+        previous = self.hashes.get(iri)
+        if previous is None:
+            self.hashes[iri] = digest
+            return True
+        if previous == digest:
+            self.repeats += 1
+            return False
+        self.conflicts += 1
+        if self.policy == ERROR:
+            raise DuplicateEntityError(iri)
+        if self.policy == MERGE:
+            logger.warning("Merging conflicting versions of entity <%s>", iri)
+            return True
+        logger.warning("Keeping the first version of entity <%s>", iri)
+        return False
+
+    def screen(self, obj):
+        """Returns the decisions of admit for the donor record and every
+        entity below it, in the order of hierarchy.walk
+        """
+        return [self.admit(entity.obj, entity.parent)
+                for entity in walk(obj)]
+
+
+class ScreenedIndex:
+    """Replays the decisions that an EntityIndex made for the records in
+    another process, e.g., the parent of a worker process
+    """
+    def __init__(self, decisions):
+        self.decisions = iter(decisions)
+
+    def admit(self, obj, parent_iri):
+        return next(self.decisions)
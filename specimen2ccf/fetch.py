@@ -0,0 +1,116 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from os.path import exists, join
+from requests.adapters import HTTPAdapter
+from requests_file import FileAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+MAX_DOWNLOADS = 8
+
+
+def new_session(retries=3, pool_size=MAX_DOWNLOADS):
+    """Creates a session whose connection pool is shared by the concurrent
+    downloads. Failed connections and transient server errors are retried
+    with an exponential backoff.
+    """
+    retry = Retry(total=retries, backoff_factor=0.5,
+                  status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.mount('file://', FileAdapter())
+    return session
+
+
+class HTTPCache:
+    """On-disk HTTP Cache
+    Keeps the downloaded inputs in a local directory together with their
+    ETag and Last-Modified validators, so that an unchanged export is
+    revalidated with a conditional request instead of being downloaded
+    again
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def fetch(self, session, url, timeout=None):
+        """Returns the path of the local copy of the given URL, downloading
+        it only if the cached copy is missing or stale
+        """
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        path = join(self.directory, key + '.json')
+        meta_path = join(self.directory, key + '.meta.json')
+
+        headers = {}
+        if exists(path) and exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        with session.get(url, headers=headers, stream=True,
+                         timeout=timeout) as response:
+            if response.status_code == 304:
+                logger.info("Not modified: %s", url)
+                return path
+            response.raise_for_status()
+            response.raw.decode_content = True
+            meta = {'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')}
+            # The stale validators are removed before the body is replaced,
+            # thus they never revalidate a body they do not belong to
+            if exists(meta_path):
+                os.remove(meta_path)
+            self._write(path, lambda f: shutil.copyfileobj(
+                response.raw, f, 1024 * 1024))
+            self._write(meta_path, lambda f: f.write(
+                json.dumps(meta).encode('utf-8')))
+        logger.info("Downloaded: %s", url)
+        return path
+
+    def _write(self, path, write):
+        """Writes a part file in the cache directory and moves it to the
+        given path once it is complete, removing it if the write fails
+        """
+        fd, part_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(part_path, path)
+        except BaseException:
+            os.remove(part_path)
+            raise
+
+
+def fetch_all(urls, fetch):
+    """Downloads the given URLs concurrently with the given function, which
+    returns the local path of a URL, e.g., from new_fetch, and returns a
+    mapping from each URL to its local path
+    """
+    if not urls:
+        return {}
+    workers = min(len(urls), MAX_DOWNLOADS)
+    with ThreadPoolExecutor(workers) as executor:
+        return dict(zip(urls, executor.map(fetch, urls)))
+
+
+def new_fetch(cache, session, timeout=None):
+    """Returns the function that downloads a URL into the cache and returns
+    the path of its local copy
+    """
+    return lambda url: cache.fetch(session, url, timeout)
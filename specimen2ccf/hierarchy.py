@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+
+DONOR = 'donor'
+TISSUE_BLOCK = 'tissue_block'
+TISSUE_SECTION = 'tissue_section'
+DATASET = 'dataset'
+
+# A specimen entity along with its IRI and the IRIs of its parent and its
+# donor, which are built once per entity by the walk
+Entity = namedtuple('Entity', 'kind obj iri parent donor')
+
+
+class _Frame:
+    """A list of samples being walked, the tissue block that the sections
+    in the list belong to and the datasets of the owner of the list, which
+    are visited once the list is exhausted
+    """
+    __slots__ = ('samples', 'tissue_block', 'owner', 'datasets')
+
+    def __init__(self, samples, tissue_block, owner=None, datasets=()):
+        self.samples = iter(samples)
+        self.tissue_block = tissue_block
+        self.owner = owner
+        self.datasets = datasets
+
+
+_EXHAUSTED = object()
+
+
+def walk(donor, iri=str):
+    """Yields the donor record and every tissue block, tissue section and
+    dataset below it, depth-first and in document order, as Entity
+    records. The given function builds the IRIs, e.g., rdflib.URIRef.
+
+    The walk uses an explicit stack, thus it supports any nesting depth.
+    A tissue section belongs to the last tissue block that precedes it in
+    the same list, or to the owner of the list, and the samples nested in
+    a section belong to that section.
+    """
+    donor_iri = iri(donor['@id'])
+    yield Entity(DONOR, donor, donor_iri, None, donor_iri)
+    stack = [_Frame(donor.get('samples', ()), None)]
+    while stack:
+        frame = stack[-1]
+        sample = next(frame.samples, _EXHAUSTED)
+        if sample is _EXHAUSTED:
+            stack.pop()
+            for dataset in frame.datasets:
+                yield Entity(DATASET, dataset, iri(dataset['@id']),
+                             frame.owner, donor_iri)
+            continue
+        sample_type = sample['sample_type']
+        if sample_type == "Tissue Block":
+            tissue_block_iri = iri(sample['@id'])
+            frame.tissue_block = tissue_block_iri
+            yield Entity(TISSUE_BLOCK, sample, tissue_block_iri, donor_iri,
+                         donor_iri)
+            stack.append(_Frame(sample.get('sections', ()), tissue_block_iri,
+                                tissue_block_iri, sample.get('datasets', ())))
+        elif sample_type == "Tissue Section":
+            if frame.tissue_block is None:
+                raise ValueError("Tissue section has missing tissue block")
+            tissue_section_iri = iri(sample['@id'])
+            yield Entity(TISSUE_SECTION, sample, tissue_section_iri,
+                         frame.tissue_block, donor_iri)
+            stack.append(_Frame(sample.get('samples', ()), tissue_section_iri,
+                                tissue_section_iri,
+                                sample.get('datasets', ())))
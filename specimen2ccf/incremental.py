@@ -0,0 +1,81 @@
+import os
+import json
+import hashlib
+import logging
+
+from os.path import exists
+
+from specimen2ccf.hierarchy import walk
+
+
+logger = logging.getLogger(__name__)
+
+# Shared by every content hash, since json.dumps() creates a new encoder for
+# every call with non-default options
+_CANONICAL_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'))
+
+
+class Manifest:
+    """Donor Manifest
+    Records the content hash of every converted donor record together with
+    the IRIs of the entities in its subtree (tissue blocks, sections and
+    datasets), which are the subjects of all the triples of that donor
+    """
+    def __init__(self, donors=None):
+        self.donors = donors if donors is not None else {}
+
+    @staticmethod
+    def load(path):
+        if not exists(path):
+            return Manifest()
+        with open(path) as f:
+            return Manifest(json.load(f)['donors'])
+
+    def save(self, path):
+        part_path = path + '.part'
+        with open(part_path, 'w') as f:
+            json.dump({'donors': self.donors}, f)
+        os.replace(part_path, path)
+
+
+def changed_records(records, previous, current, retract):
+    """Yields the donor records that were added or changed since the previous
+    manifest and records all of them in the current one. The subtree of a
+    changed donor is retracted before the donor is yielded, and the
+    subtrees of the donors missing from the input are retracted once the
+    records are exhausted.
+    """
+    unchanged = 0
+    for obj in records:
+        donor_id = obj['@id']
+        digest = content_hash(obj)
+        current.donors[donor_id] = {'hash': digest,
+                                    'subjects': subject_iris(obj)}
+        entry = previous.donors.get(donor_id)
+        if entry is not None:
+            if entry['hash'] == digest:
+                unchanged += 1
+                continue
+            retract(entry['subjects'])
+        yield obj
+    removed = previous.donors.keys() - current.donors.keys()
+    for donor_id in removed:
+        retract(previous.donors[donor_id]['subjects'])
+    logger.info("Incremental rebuild: %d converted, %d unchanged, "
+                "%d removed", len(current.donors) - unchanged, unchanged,
+                len(removed))
+
+
+def content_hash(obj):
+    """Returns a digest of the record that does not depend on the order of
+    its keys
+    """
+    content = _CANONICAL_ENCODER.encode(obj)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def subject_iris(obj):
+    """Returns the IRIs of the donor and of every entity below it, i.e.,
+    the subjects of its triples
+    """
+    return [entity.iri for entity in walk(obj)]
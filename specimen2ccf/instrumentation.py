@@ -0,0 +1,154 @@
+import sys
+import json
+import time
+import logging
+import cProfile
+import tracemalloc
+
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+
+logger = logging.getLogger(__name__)
+
+
+class Instrumentation:
+    """Pipeline Instrumentation
+    Collects the wall and CPU time spent in every stage of a conversion and
+    counters of the converted entities and emitted triples. Optionally runs
+    cProfile and tracemalloc over the whole conversion.
+    """
+    enabled = True
+
+    def __init__(self, profile=False, trace_memory=False):
+        self.stages = {}
+        self.counters = Counter()
+        self.profiler = cProfile.Profile() if profile else None
+        self.trace_memory = trace_memory
+        self.memory = None
+        self.started = None
+        self.total = None
+
+    def start(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profiler is not None:
+            self.profiler.enable()
+        self.started = (time.perf_counter(), time.process_time())
+
+    def stop(self):
+        wall, cpu = self.started
+        self.total = {'wall_seconds': time.perf_counter() - wall,
+                      'cpu_seconds': time.process_time() - cpu}
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+            tracemalloc.stop()
+            self.memory = {
+                'current_bytes': current,
+                'peak_bytes': peak,
+                'top_allocations': [{'location': str(stat.traceback),
+                                     'bytes': stat.size,
+                                     'blocks': stat.count}
+                                    for stat in top]
+            }
+
+    @contextmanager
+    def stage(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self._record(name, time.perf_counter() - wall,
+                         time.process_time() - cpu, 1)
+
+    def iterate(self, name, iterable):
+        """Yields the items of the iterable while timing how long it takes
+        to produce them, e.g., to separate JSON decoding from conversion
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def merge(self, report):
+        """Adds the stages and counters of a report from another process
+        """
+        for name, stage in report['stages'].items():
+            self._record(name, stage['wall_seconds'], stage['cpu_seconds'],
+                         stage['calls'])
+        self.counters.update(report['counters'])
+
+    def report(self):
+        report = {'stages': self.stages, 'counters': dict(self.counters)}
+        if self.total is not None:
+            report['total'] = self.total
+        if self.memory is not None:
+            report['memory'] = self.memory
+        return report
+
+    def write_report(self, path):
+        """Writes the report as JSON to the given path, or to the standard
+        error if the path is '-'
+        """
+        for name, stage in sorted(self.stages.items()):
+            logger.info("%s: %.3fs wall, %.3fs CPU, %d calls", name,
+                        stage['wall_seconds'], stage['cpu_seconds'],
+                        stage['calls'])
+        if path == '-':
+            json.dump(self.report(), sys.stderr, indent=2)
+        else:
+            with open(path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+
+    def dump_profile(self, path):
+        """Writes the cProfile statistics, which can be read with pstats
+        """
+        self.profiler.dump_stats(path)
+
+    def _record(self, name, wall, cpu, calls):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'wall_seconds': 0.0,
+                                         'cpu_seconds': 0.0,
+                                         'calls': 0}
+        stage['wall_seconds'] += wall
+        stage['cpu_seconds'] += cpu
+        stage['calls'] += calls
+
+
+class NoInstrumentation(Instrumentation):
+    """Does nothing, at the smallest possible cost
+    """
+    enabled = False
+    _context = nullcontext()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def stage(self, name):
+        return self._context
+
+    def iterate(self, name, iterable):
+        return iterable
+
+    def count(self, name, n=1):
+        pass
+
+    def merge(self, report):
+        pass
+
+
+NO_INSTRUMENTATION = NoInstrumentation()
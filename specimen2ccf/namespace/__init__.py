@@ -1,4 +1,7 @@
-from typing import List
+import warnings
+
+from types import MappingProxyType
+from typing import List, Mapping
 from rdflib.term import URIRef, Variable, _is_valid_uri
 
 
@@ -72,8 +75,24 @@ class DefinedNamespaceMeta(type):
     _fail: bool = False  # True means mimic ClosedNamespace
     _extras: List[str] = []  # List of non-pythonesque items
     _underscore_num: bool = False  # True means pass "_n" constructs
+    _terms: Mapping[str, URIRef] = MappingProxyType({})  # Defined terms
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        if "_NS" in namespace:
+            # Precompute the defined terms so that a lookup is a single dict
+            # access instead of a validation walk over the class hierarchy
+            cls._terms = MappingProxyType({
+                term: cls._NS[term]
+                for c in cls.mro()
+                if issubclass(c, DefinedNamespace)
+                for term in list(c.__dict__.get("__annotations__", {})) + c._extras
+            })
 
     def __getitem__(cls, name, default=None):
+        term = cls._terms.get(name)
+        if term is not None:
+            return term
         name = str(name)
         if str(name).startswith("__"):
             return super().__getitem__(name, default)
@@ -1,42 +1,144 @@
+import logging
+
+from functools import lru_cache
+
+from specimen2ccf.hierarchy import walk, DONOR, TISSUE_BLOCK, \
+    TISSUE_SECTION, DATASET
+from specimen2ccf.instrumentation import NO_INSTRUMENTATION
 from specimen2ccf.namespace import CCF
+from specimen2ccf.validation import FAIL, InvalidRecordError, validate
+from specimen2ccf.writer import PLUGINS
 
 from rdflib import Graph, URIRef, Literal
 from rdflib import OWL, XSD, RDF, RDFS, DC, DCTERMS
-from rdflib.extras.infixowl import Ontology, Property
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of the interned literals and IRIs, which are mostly repeated
+# values like consortium names, sample types, units and technologies
+TERM_CACHE_SIZE = 4096
+
+# Number of pending triples after which they are inserted into the graph
+BATCH_SIZE = 10000
+
+# Object properties declared in the ontology header
+OBJECT_PROPERTIES = (
+    CCF.has_biological_sex,
+    CCF.provides,
+    CCF.comes_from,
+    CCF.part_of_tissue_block,
+    CCF.subdivided_into_sections,
+    CCF.generates_dataset,
+    CCF.has_registration_location
+)
+
+# Namespace bindings of the ontology, next to the default ones of rdflib
+NAMESPACES = (
+    ('ccf', CCF),
+    ('owl', OWL),
+    ('dc', DC),
+    ('dcterms', DCTERMS)
+)
+
+MALE = URIRef("http://purl.bioontology.org/ontology/LNC/LA2-8")
+FEMALE = URIRef("http://purl.bioontology.org/ontology/LNC/LA3-6")
+
+
+class OntologyHeader:
+    """Ontology Header
+    The triples and namespace bindings that start every ontology, i.e., the
+    ontology declaration and the declaration axioms of the object
+    properties. The header is built once per ontology IRI, see
+    ontology_header(), and then copied into new graphs or written to
+    streaming writers as it is.
+    """
+    def __init__(self, ontology_iri):
+        self.ontology_iri = URIRef(ontology_iri)
+        g = Graph()
+        for prefix, namespace in NAMESPACES:
+            g.bind(prefix, namespace)
+        self.namespaces = tuple(g.namespaces())
+        # Ontology properties, then the declaration axioms
+        self.triples = ((self.ontology_iri, RDF.type, OWL.Ontology),) + \
+            tuple((object_property, RDF.type, OWL.ObjectProperty)
+                  for object_property in OBJECT_PROPERTIES)
+
+    def new_graph(self):
+        """Returns a new in-memory graph that holds only the header. A new
+        graph comes with the default bindings of rdflib, thus only the ones
+        of the ontology are added.
+        """
+        graph = Graph(identifier=self.ontology_iri)
+        for prefix, namespace in NAMESPACES:
+            graph.bind(prefix, namespace)
+        graph.addN((s, p, o, graph) for s, p, o in self.triples)
+        return graph
+
+    def write(self, sink):
+        """Binds the namespaces in the graph or writer and adds the header
+        triples to it
+        """
+        for prefix, namespace in self.namespaces:
+            sink.bind(prefix, namespace)
+        sink.addN((s, p, o, sink) for s, p, o in self.triples)
+
+
+@lru_cache(maxsize=16)
+def ontology_header(ontology_iri):
+    """Returns the shared header of the ontology with the given IRI
+    """
+    return OntologyHeader(ontology_iri)
 
 
 class SCOntology:
     """CCF Specimen Data Ontology
     Represents the Specimen Data Ontology graph that can be mutated by
     supplying the HuBMAP specimen records
+
+    The triples of each record are collected first and inserted into the
+    graph in bulk once at least batch_size of them are pending. A batch_size
+    of None defers the insertion, and thus the index maintenance of the
+    graph, until the ontology is serialized.
+
+    If a SpecimenTables instance is given, a flat row of every converted
+    entity is added to it as well.
+
+    Every donor record is validated before any of its triples are added.
+    An invalid record raises InvalidRecordError with all of its errors if
+    on_invalid is 'fail', and is logged and left out if it is 'skip'.
+
+    If an EntityIndex is given, only the entities that it admits are
+    converted, e.g., not the repeats of an entity from overlapping inputs.
     """
-    def __init__(self, graph=None):
+    def __init__(self, graph=None, instrumentation=NO_INSTRUMENTATION,
+                 batch_size=BATCH_SIZE, tables=None, on_invalid=FAIL,
+                 index=None):
         self.graph = graph
+        self.instrumentation = instrumentation
+        self.batch_size = batch_size
+        self.tables = tables
+        self.on_invalid = on_invalid
+        self.index = index
+        self.pending = []
+        store = getattr(graph, 'store', None)
+        self.transactional = getattr(store, 'transaction_aware', False)
 
     @staticmethod
-    def new(ontology_iri):
-        g = Graph()
-        g.bind('ccf', CCF)
-        g.bind('owl', OWL)
-        g.bind('dc', DC)
-        g.bind('dcterms', DCTERMS)
-
-        # Ontology properties
-        Ontology(identifier=URIRef(ontology_iri), graph=g)
-
-        # Declaration axioms
-        Property(CCF.has_biological_sex, baseType=OWL.ObjectProperty, graph=g)
-        Property(CCF.provides, baseType=OWL.ObjectProperty, graph=g)
-        Property(CCF.comes_from, baseType=OWL.ObjectProperty, graph=g)
-        Property(CCF.part_of_tissue_block, baseType=OWL.ObjectProperty,
-                 graph=g)
-        Property(CCF.subdivided_into_sections, baseType=OWL.ObjectProperty,
-                 graph=g)
-        Property(CCF.generates_dataset, baseType=OWL.ObjectProperty, graph=g)
-        Property(CCF.has_registration_location, baseType=OWL.ObjectProperty,
-                 graph=g)
-
-        return SCOntology(g)
+    def new(ontology_iri, graph=None, instrumentation=NO_INSTRUMENTATION,
+            batch_size=BATCH_SIZE, tables=None, on_invalid=FAIL,
+            index=None):
+        """Creates a new ontology with its header. The triples are added to
+        an in-memory rdflib Graph unless another graph-like sink is given,
+        e.g., a streaming TripleWriter
+        """
+        header = ontology_header(ontology_iri)
+        if graph is None:
+            graph = header.new_graph()
+        else:
+            header.write(graph)
+        return SCOntology(graph, instrumentation, batch_size, tables,
+                          on_invalid, index)
 
     def mutate(self, data):
         """
@@ -45,109 +147,162 @@ class SCOntology:
         if isinstance(data, dict):
             data_array = data['@graph']
         for obj in data_array:
+            if not self.validate(obj):
+                continue
             publisher = self._get_publisher(obj)
             self._add_specimen_data(obj, publisher)
-        return SCOntology(self.graph)
+            if self.transactional:
+                self.commit()
+            elif self.batch_size is not None and \
+                    len(self.pending) >= self.batch_size:
+                self.flush()
+        if self.batch_size is not None:
+            self.flush()
+        return self._derive()
+
+    def retract(self, iris):
+        """Removes every triple about the given entities, e.g., the subtree
+        of a donor that is no longer in the input
+        """
+        self.flush()
+        for iri in iris:
+            self.graph.remove((self._uri(iri), None, None))
+        return self._derive()
+
+    def flush(self):
+        """Inserts the pending triples into the graph in one bulk operation
+        """
+        if not self.pending:
+            return
+        with self.instrumentation.stage('flush'):
+            graph = self.graph
+            graph.addN((s, p, o, graph) for s, p, o in self.pending)
+            self.pending.clear()
+
+    def commit(self):
+        """Commits the triples added so far when the graph is backed by a
+        transactional store, so that every donor is stored atomically
+        """
+        self.flush()
+        if self.transactional:
+            self.graph.commit()
+
+    def _derive(self):
+        o = SCOntology(self.graph, self.instrumentation, self.batch_size,
+                       self.tables, self.on_invalid, self.index)
+        o.pending = self.pending
+        return o
+
+    def validate(self, obj):
+        """Returns whether the record is valid, or raises if it is not and
+        invalid records are not skipped
+        """
+        with self.instrumentation.stage('validate'):
+            errors = validate(obj)
+        if not errors:
+            return True
+        donor_id = obj.get('@id') if isinstance(obj, dict) else None
+        if self.on_invalid == FAIL:
+            raise InvalidRecordError(donor_id, errors)
+        logger.warning("Skipping invalid donor record <%s>: %s", donor_id,
+                       '; '.join('%s: %s' % error for error in errors))
+        self.instrumentation.count('invalid_records')
+        return False
 
     def _add_specimen_data(self, obj, publisher):
         object_type = obj['@type']
         if object_type == "Donor":
-            self._add_donor(obj, publisher)
+            handlers = {
+                DONOR: self._add_donor,
+                TISSUE_BLOCK: self._add_tissue_block,
+                TISSUE_SECTION: self._add_tissue_section,
+                DATASET: self._add_dataset
+            }
+            index = self.index
+            for kind, entity, iri, parent_iri, donor_iri in \
+                    walk(obj, self._uri):
+                if index is not None and not index.admit(entity, parent_iri):
+                    continue
+                handlers[kind](entity, iri, parent_iri, donor_iri, publisher)
         else:
             raise ValueError("Unknown object_type <" + object_type + ">")
 
-    def _add_donor(self, obj, publisher):
-        donor_iri = self._uri(obj['@id'])
-        self._add_donor_to_graph(
-            donor_iri,
-            self._string(obj['label']),  # more like a description
-            self._string(obj['description']),  # more like a comment
-            self._string(obj['link']),
-            self._get_age(obj),
-            self._get_biological_sex(obj),
-            self._get_bmi(obj),
-            self._string(obj['consortium_name']),
-            self._get_provider_name(obj),
-            self._get_provider_uuid(obj),
-            publisher)
-        if 'samples' in obj:
-            self._add_samples(donor_iri, None, obj['samples'], publisher)
+    def _add_donor(self, obj, donor_iri, _parent_iri, _donor_iri, publisher):
+        with self.instrumentation.stage('mutate.donor'):
+            self._add_donor_to_graph(
+                donor_iri,
+                self._string(obj['label']),  # more like a description
+                self._string(obj['description']),  # more like a comment
+                self._string(obj['link']),
+                self._get_age(obj),
+                self._get_biological_sex(obj),
+                self._get_bmi(obj),
+                self._string(obj['consortium_name']),
+                self._get_provider_name(obj),
+                self._get_provider_uuid(obj),
+                publisher)
+        self.instrumentation.count('donors')
+        if self.tables is not None:
+            self.tables.add_donor(obj)
 
     def _add_donor_to_graph(self, donor_iri, description, comment, link,
                             age, biological_sex, bmi, consortium_name,
                             provider_name, provider_uuid, publisher):
-        self.graph.add((donor_iri, RDF.type, OWL.NamedIndividual))
-        self.graph.add((donor_iri, RDF.type, CCF.donor))
-        self.graph.add((donor_iri, CCF.description, description))
-        self.graph.add((donor_iri, RDFS.comment, comment))
-        self.graph.add((donor_iri, CCF.url, link))
+        emit = self.pending.append
+        emit((donor_iri, RDF.type, OWL.NamedIndividual))
+        emit((donor_iri, RDF.type, CCF.donor))
+        emit((donor_iri, CCF.description, description))
+        emit((donor_iri, RDFS.comment, comment))
+        emit((donor_iri, CCF.url, link))
         if age:
-            self.graph.add((donor_iri, CCF.age, age))
+            emit((donor_iri, CCF.age, age))
         if biological_sex:
-            self.graph.add((donor_iri, CCF.has_biological_sex, biological_sex))
+            emit((donor_iri, CCF.has_biological_sex, biological_sex))
         if bmi:
-            self.graph.add((donor_iri, CCF.bmi, bmi))
-        self.graph.add((donor_iri, CCF.consortium_name, consortium_name))
+            emit((donor_iri, CCF.bmi, bmi))
+        emit((donor_iri, CCF.consortium_name, consortium_name))
         if provider_name:
-            self.graph.add((donor_iri, CCF.tissue_provider_name, provider_name))
+            emit((donor_iri, CCF.tissue_provider_name, provider_name))
         if provider_uuid:
-            self.graph.add((donor_iri, CCF.tissue_provider_uuid, provider_uuid))
-        self.graph.add((donor_iri, DCTERMS.publisher, publisher))
-
-    def _add_samples(self, donor_iri, tissue_block, any_samples, publisher):
-        for any_sample in any_samples:
-            sample_type = any_sample['sample_type']
-            if sample_type == "Tissue Block":
-                tissue_block = any_sample
-                tissue_block_iri = self._uri(tissue_block['@id'])
-                registration_location_iri =\
-                    self._uri(tissue_block['rui_location']['@id'])
-                self._add_tissue_block_to_graph(
-                    tissue_block_iri,
-                    registration_location_iri,
-                    donor_iri,
-                    self._string(sample_type),
-                    self._string(tissue_block['label']),  # more like a comment
-                    self._string(tissue_block['description']),
-                    self._string(tissue_block['link']),
-                    self._integer(tissue_block['section_count']),
-                    self._integer(tissue_block['section_size']),
-                    self._string(tissue_block['section_units']),
-                    publisher)
-                if 'sections' in tissue_block:
-                    self._add_samples(donor_iri,
-                                      tissue_block,
-                                      tissue_block['sections'],
-                                      publisher)
-                if 'datasets' in tissue_block:
-                    self._add_datasets(tissue_block,
-                                       tissue_block['datasets'],
-                                       publisher)
-            elif sample_type == "Tissue Section":
-                tissue_section = any_sample
-                if tissue_block is None:
-                    raise ValueError("Tissue section has missing tissue block")
-                tissue_block_iri = self._uri(tissue_block['@id'])
-                tissue_section_iri = self._uri(tissue_section['@id'])
-                self._add_tissue_section_to_graph(
-                    tissue_block_iri,
-                    tissue_section_iri,
-                    donor_iri,
-                    self._string(sample_type),
-                    self._string(tissue_section['label']),  # more like a comment
-                    self._string(tissue_section['description']),
-                    self._string(tissue_section['link']),
-                    self._integer(tissue_section['section_number']),
-                    publisher)
-                if 'samples' in tissue_section:
-                    self._add_samples(donor_iri,
-                                      tissue_section,
-                                      tissue_section['samples'],
-                                      publisher)
-                if 'datasets' in tissue_section:
-                    self._add_datasets(tissue_section,
-                                       tissue_section['datasets'],
-                                       publisher)
+            emit((donor_iri, CCF.tissue_provider_uuid, provider_uuid))
+        emit((donor_iri, DCTERMS.publisher, publisher))
+
+    def _add_tissue_block(self, tissue_block, tissue_block_iri, donor_iri,
+                          _donor_iri, publisher):
+        with self.instrumentation.stage('mutate.tissue_block'):
+            self._add_tissue_block_to_graph(
+                tissue_block_iri,
+                self._uri(tissue_block['rui_location']['@id']),
+                donor_iri,
+                self._string(tissue_block['sample_type']),
+                self._string(tissue_block['label']),  # more like a comment
+                self._string(tissue_block['description']),
+                self._string(tissue_block['link']),
+                self._integer(tissue_block['section_count']),
+                self._integer(tissue_block['section_size']),
+                self._string(tissue_block['section_units']),
+                publisher)
+        self.instrumentation.count('tissue_blocks')
+        if self.tables is not None:
+            self.tables.add_tissue_block(tissue_block, donor_iri)
+
+    def _add_tissue_section(self, tissue_section, tissue_section_iri,
+                            tissue_block_iri, donor_iri, publisher):
+        with self.instrumentation.stage('mutate.tissue_section'):
+            self._add_tissue_section_to_graph(
+                tissue_block_iri,
+                tissue_section_iri,
+                donor_iri,
+                self._string(tissue_section['sample_type']),
+                self._string(tissue_section['label']),  # more like a comment
+                self._string(tissue_section['description']),
+                self._string(tissue_section['link']),
+                self._integer(tissue_section['section_number']),
+                publisher)
+        self.instrumentation.count('tissue_sections')
+        if self.tables is not None:
+            self.tables.add_tissue_section(tissue_section, tissue_block_iri,
+                                           donor_iri)
 
     def _add_tissue_block_to_graph(self, tissue_block_iri,
                                    registration_location_iri,
@@ -155,126 +310,141 @@ class SCOntology:
                                    description, link,
                                    section_count, section_size,
                                    section_size_unit, publisher):
-        self.graph.add((tissue_block_iri, RDF.type, OWL.NamedIndividual))
-        self.graph.add((tissue_block_iri, RDF.type, CCF.tissue_block))
-        self.graph.add((tissue_block_iri, CCF.has_registration_location,
-                        registration_location_iri))
-        self.graph.add((tissue_block_iri, CCF.comes_from, donor_iri))
-        self.graph.add((donor_iri, CCF.provides, tissue_block_iri))
-        self.graph.add((tissue_block_iri, CCF.sample_type, sample_type))
-        self.graph.add((tissue_block_iri, RDFS.comment, comment))
-        self.graph.add((tissue_block_iri, CCF.description, description))
-        self.graph.add((tissue_block_iri, CCF.url, link))
-        self.graph.add((tissue_block_iri, CCF.section_count, section_count))
-        self.graph.add((tissue_block_iri, CCF.section_size, section_size))
-        self.graph.add((tissue_block_iri, CCF.section_size_unit,
-                        section_size_unit))
-        self.graph.add((tissue_block_iri, DCTERMS.publisher, publisher))
+        emit = self.pending.append
+        emit((tissue_block_iri, RDF.type, OWL.NamedIndividual))
+        emit((tissue_block_iri, RDF.type, CCF.tissue_block))
+        emit((tissue_block_iri, CCF.has_registration_location,
+              registration_location_iri))
+        emit((tissue_block_iri, CCF.comes_from, donor_iri))
+        emit((donor_iri, CCF.provides, tissue_block_iri))
+        emit((tissue_block_iri, CCF.sample_type, sample_type))
+        emit((tissue_block_iri, RDFS.comment, comment))
+        emit((tissue_block_iri, CCF.description, description))
+        emit((tissue_block_iri, CCF.url, link))
+        emit((tissue_block_iri, CCF.section_count, section_count))
+        emit((tissue_block_iri, CCF.section_size, section_size))
+        emit((tissue_block_iri, CCF.section_size_unit, section_size_unit))
+        emit((tissue_block_iri, DCTERMS.publisher, publisher))
 
     def _add_tissue_section_to_graph(self, tissue_block_iri,
                                      tissue_section_iri, donor_iri,
                                      sample_type, comment, description,
                                      link, section_number, publisher):
-        self.graph.add((tissue_section_iri, RDF.type, OWL.NamedIndividual))
-        self.graph.add((tissue_section_iri, RDF.type, CCF.tissue_section))
-        self.graph.add((tissue_section_iri, CCF.part_of_tissue_block,
-                        tissue_block_iri))
-        self.graph.add((tissue_block_iri, CCF.subdivided_into_sections,
-                        tissue_section_iri))
-        self.graph.add((tissue_section_iri, CCF.comes_from, donor_iri))
-        self.graph.add((donor_iri, CCF.provides, tissue_section_iri))
-        self.graph.add((tissue_section_iri, CCF.sample_type, sample_type))
-        self.graph.add((tissue_section_iri, RDFS.comment, comment))
-        self.graph.add((tissue_section_iri, CCF.description, description))
-        self.graph.add((tissue_section_iri, CCF.url, link))
-        self.graph.add((tissue_section_iri, CCF.section_number,
-                        section_number))
-        self.graph.add((tissue_section_iri, DCTERMS.publisher, publisher))
-
-    def _add_datasets(self, any_sample, datasets, publisher):
-        for dataset in datasets:
+        emit = self.pending.append
+        emit((tissue_section_iri, RDF.type, OWL.NamedIndividual))
+        emit((tissue_section_iri, RDF.type, CCF.tissue_section))
+        emit((tissue_section_iri, CCF.part_of_tissue_block, tissue_block_iri))
+        emit((tissue_block_iri, CCF.subdivided_into_sections,
+              tissue_section_iri))
+        emit((tissue_section_iri, CCF.comes_from, donor_iri))
+        emit((donor_iri, CCF.provides, tissue_section_iri))
+        emit((tissue_section_iri, CCF.sample_type, sample_type))
+        emit((tissue_section_iri, RDFS.comment, comment))
+        emit((tissue_section_iri, CCF.description, description))
+        emit((tissue_section_iri, CCF.url, link))
+        emit((tissue_section_iri, CCF.section_number, section_number))
+        emit((tissue_section_iri, DCTERMS.publisher, publisher))
+
+    def _add_dataset(self, dataset, dataset_iri, sample_iri, donor_iri,
+                     publisher):
+        with self.instrumentation.stage('mutate.dataset'):
             self._add_dataset_to_graph(
-                self._uri(dataset['@id']),
-                self._uri(any_sample['@id']),
+                dataset_iri,
+                sample_iri,
                 self._string(dataset['label']),  # more like a comment
                 self._string(dataset['description']),
                 self._string(dataset['link']),
                 self._string(dataset['technology']),
                 self._string(dataset['thumbnail']),
                 publisher)
+        self.instrumentation.count('datasets')
+        if self.tables is not None:
+            self.tables.add_dataset(dataset, sample_iri, donor_iri)
 
     def _add_dataset_to_graph(self, dataset_iri, sample_iri, comment,
                               description, link, technology, thumbnail,
                               publisher):
-        self.graph.add((dataset_iri, RDF.type, OWL.NamedIndividual))
-        self.graph.add((dataset_iri, RDF.type, CCF.dataset))
-        self.graph.add((sample_iri, CCF.generates_dataset, dataset_iri))
-        self.graph.add((dataset_iri, RDFS.comment, comment))
-        self.graph.add((dataset_iri, CCF.description, description))
-        self.graph.add((dataset_iri, CCF.url, link))
-        self.graph.add((dataset_iri, CCF.technology, technology))
-        self.graph.add((dataset_iri, CCF.thumbnail, thumbnail))
-        self.graph.add((dataset_iri, DCTERMS.publisher, publisher))
+        emit = self.pending.append
+        emit((dataset_iri, RDF.type, OWL.NamedIndividual))
+        emit((dataset_iri, RDF.type, CCF.dataset))
+        emit((sample_iri, CCF.generates_dataset, dataset_iri))
+        emit((dataset_iri, RDFS.comment, comment))
+        emit((dataset_iri, CCF.description, description))
+        emit((dataset_iri, CCF.url, link))
+        emit((dataset_iri, CCF.technology, technology))
+        emit((dataset_iri, CCF.thumbnail, thumbnail))
+        emit((dataset_iri, DCTERMS.publisher, publisher))
 
     def _get_publisher(self, obj):
-        try:
-            return self._string(obj['consortium_name'])
-        except KeyError:
-            return None
+        return self._optional(self._string, obj.get('consortium_name'))
 
     def _get_age(self, obj):
-        try:
-            return self._integer(obj['age'])
-        except KeyError:
-            return None
+        return self._optional(self._integer, obj.get('age'))
 
     def _get_bmi(self, obj):
-        try:
-            return self._decimal(obj['bmi'])
-        except KeyError:
-            return None
+        return self._optional(self._decimal, obj.get('bmi'))
 
     def _get_provider_name(self, obj):
-        try:
-            return self._string(obj['provider_name'])
-        except KeyError:
-            return None
+        return self._optional(self._string, obj.get('provider_name'))
 
     def _get_provider_uuid(self, obj):
-        try:
-            return self._string(obj['provider_uuid'])
-        except KeyError:
-            return None
+        return self._optional(self._string, obj.get('provider_uuid'))
 
     def _get_biological_sex(self, obj):
-        try:
-            biological_sex = None
-            if obj['sex'] == "Male":
-                biological_sex =\
-                    self._uri("http://purl.bioontology.org/ontology/LNC/LA2-8")
-            elif obj['sex'] == "Female":
-                biological_sex =\
-                    self._uri("http://purl.bioontology.org/ontology/LNC/LA3-6")
-            return biological_sex
-        except KeyError:
-            return None
+        sex = obj.get('sex')
+        if sex == "Male":
+            return MALE
+        elif sex == "Female":
+            return FEMALE
+        return None
+
+    def _optional(self, term, value):
+        return None if value is None else term(value)
 
     def _uri(self, str):
-        return URIRef(str)
+        return _intern_uri(str)
 
     def _string(self, str):
-        return Literal(str)
+        return _intern_literal(str, None)
 
     def _integer(self, str):
-        return Literal(str, datatype=XSD.integer)
+        return _intern_literal(str, XSD.integer)
 
     def _decimal(self, str):
-        return Literal(str, datatype=XSD.decimal)
+        return _intern_literal(str, XSD.decimal)
 
     def _date(self, str):
-        return Literal(str, datatype=XSD.date)
+        return _intern_literal(str, XSD.date)
 
-    def serialize(self, destination):
+    def serialize(self, destination, format='ttl'):
+        """Serializes the ontology to the destination, which is a path or a
+        binary stream, in one of the rdflib formats, 'nquads' or 'binary'.
+        The N-Quads are written into the graph named after the ontology.
         """
-        """
-        self.graph.serialize(format='ttl', destination=destination)
+        self.flush()
+        self.graph.serialize(format=PLUGINS.get(format, format),
+                             destination=destination)
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def _cached_uri(value):
+    return URIRef(value)
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE, typed=True)
+def _cached_literal(value, datatype):
+    return Literal(value, datatype=datatype)
+
+
+def _intern_uri(value):
+    try:
+        return _cached_uri(value)
+    except TypeError:  # unhashable value
+        return URIRef(value)
+
+
+def _intern_literal(value, datatype):
+    try:
+        return _cached_literal(value, datatype)
+    except TypeError:  # unhashable value
+        return Literal(value, datatype=datatype)
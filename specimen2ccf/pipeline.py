@@ -1,26 +1,532 @@
 import json
-import requests
+import logging
+import tempfile
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext, ExitStack
 from urllib.parse import urlparse
 from os.path import exists
-from requests_file import FileAdapter
+from rdflib import plugin, Graph, URIRef
+from rdflib.plugin import PluginException
+from rdflib.serializer import Serializer
 
+from specimen2ccf.chunks import iter_chunks
+from specimen2ccf.compression import open_writer, open_reader, \
+    import_zstandard
+from specimen2ccf.dedup import EntityIndex, ScreenedIndex
+from specimen2ccf.incremental import Manifest, changed_records
+from specimen2ccf.instrumentation import Instrumentation, NO_INSTRUMENTATION
 from specimen2ccf.ontology import SCOntology
+from specimen2ccf.reader import RecordReader
+from specimen2ccf.sharding import ShardIndex, shard_key
+from specimen2ccf.spill import SpillingGraph, parse_size
+from specimen2ccf.tables import SpecimenTables
+from specimen2ccf.validation import FAIL
+from specimen2ccf.writer import PLUGINS, new_writer
+
+
+logger = logging.getLogger(__name__)
 
 
 def run(args):
     """
     """
-    session = requests.Session()
-    session.mount('file://', FileAdapter())
+    check_output(args)
+    instrumentation = new_instrumentation(args)
+    instrumentation.start()
+    tables = open_tables(args)
+    with open_cache_dir(args.cache_dir) as cache_dir:
+        if args.asynchronous:
+            # The stages of the asynchronous pipeline fetch the inputs, too
+            import asyncio
+            from specimen2ccf.aio import run_async
+            asyncio.run(run_async(args, cache_dir, instrumentation, tables))
+        else:
+            convert_inputs(args, cache_dir, instrumentation, tables)
+    if tables is not None:
+        with instrumentation.stage('tables'):
+            tables.close()
+    instrumentation.stop()
+
+    if args.stats:
+        instrumentation.write_report(args.stats)
+    elif args.trace_memory:
+        # The report is the only place the traced memory shows up
+        instrumentation.write_report('-')
+    if args.profile:
+        instrumentation.dump_profile(args.profile)
+
+
+def convert_inputs(args, cache_dir, instrumentation, tables):
+    """Fetches the remote inputs, then converts the inputs one after the
+    other in the mode given on the command line
+    """
+    remote_urls = [url for url in args.input_file if not is_local(url)]
+    with instrumentation.stage('fetch'):
+        paths = fetch_remote(remote_urls, cache_dir, args)
+    inputs = [paths.get(url, url) for url in args.input_file]
+
+    if args.shard_by:
+        run_sharded(inputs, args, instrumentation, tables)
+    elif args.incremental:
+        run_incremental(inputs, args, instrumentation)
+    elif args.stream_output:
+        with open_output(args) as stream:
+            writer = new_writer(args.format, stream, graph_name(args))
+            o = SCOntology.new(args.ontology_iri, writer,
+                               instrumentation, batch_size(args), tables,
+                               args.on_invalid, new_index(args))
+            convert(o, read_records(inputs, args.stream_input), args,
+                    stream)
+    else:
+        graph = open_graph(args)
+        try:
+            o = SCOntology.new(args.ontology_iri, graph, instrumentation,
+                               batch_size(args), tables, args.on_invalid,
+                               new_index(args))
+            convert(o, read_records(inputs, args.stream_input), args)
+        finally:
+            graph.close(commit_pending_transaction=True)
+
+
+def open_graph(args):
+    """Returns an in-memory graph, a graph that spills its triples to disk
+    to stay within the memory budget given on the command line, or a graph
+    backed by the persistent store given on the command line, which is
+    created if it does not exist yet
+    """
+    identifier = graph_name(args)
+    if args.max_memory is not None:
+        if args.store is not None or args.incremental:
+            raise ValueError("A memory budget cannot be combined with a "
+                             "persistent store or incremental mode")
+        if args.format == 'json-ld':
+            raise ValueError("A memory budget requires a streaming output "
+                             "format, i.e., not json-ld")
+        return SpillingGraph(parse_size(args.max_memory), identifier)
+    if args.store is None:
+        return Graph(identifier=identifier)
+    import specimen2ccf.store  # noqa: F401, registers the SQLite store
+    graph = Graph(store=args.store_type, identifier=identifier)
+    graph.open(args.store, create=True)
+    return graph
+
+
+def graph_name(args):
+    """Returns the name of the graph, which is written into the N-Quads
+    output and loaded into the triple store, the ontology IRI by default
+    """
+    return URIRef(args.graph_iri or args.ontology_iri)
+
+
+def open_tables(args):
+    """Returns the tables that collect a flat row of every converted entity
+    if a tables directory is given on the command line, or None
+    """
+    if args.tables_dir is None:
+        return None
+    if args.incremental:
+        raise ValueError("Table export requires a full conversion, thus it "
+                         "cannot be combined with incremental mode")
+    return SpecimenTables(args.tables_dir, args.tables_format)
+
+
+def batch_size(args):
+    """Returns the insertion batch size, which is None if the insertion of
+    the triples is deferred until serialization
+    """
+    return None if args.defer_indexing else args.batch_size
+
+
+def new_index(args):
+    """Returns the index of the converted entities if a duplicate policy is
+    given on the command line, or None
+    """
+    if args.duplicates is None:
+        return None
+    return EntityIndex(args.duplicates)
+
+
+def new_instrumentation(args):
+    if args.stats or args.profile or args.trace_memory:
+        return Instrumentation(profile=args.profile is not None,
+                               trace_memory=args.trace_memory)
+    return NO_INSTRUMENTATION
+
+
+def check_output(args):
+    """Fails before any conversion, and before any output is truncated, if
+    the output cannot be streamed with the given format or graph, if the
+    output format or the compression requires an optional package that is
+    not installed, or if the output cannot be published
+    """
+    if args.stream_output and args.store is not None:
+        raise ValueError("A persistent store holds the whole graph, thus it "
+                         "cannot be combined with streamed output")
+    if args.stream_output and args.max_memory is not None:
+        raise ValueError("Streamed output keeps no graph in memory, thus "
+                         "it cannot be combined with a memory budget")
+    if args.stream_output and args.format == 'json-ld':
+        raise ValueError("JSON-LD output cannot be streamed, it requires "
+                         "the whole graph")
+    if args.publish is not None and (args.stream_output or args.shard_by):
+        raise ValueError("Publishing requires the whole graph, thus it "
+                         "cannot be combined with streamed or sharded "
+                         "output")
+    if args.format == 'json-ld':
+        try:
+            plugin.get('json-ld', Serializer)
+        except PluginException:
+            raise ImportError("JSON-LD output requires the rdflib-jsonld "
+                              "package") from None
+    if args.compress == 'zstd':
+        import_zstandard()
+
+
+def convert(o, records, args, stream=None):
+    """Mutates the ontology with the given specimen records and serializes
+    it to the given output stream, or to the output opened once the
+    conversion is done, timing each stage
+    """
+    instrumentation = o.instrumentation
+    with instrumentation.stage('mutate'):
+        o = mutate_records(o, instrumentation.iterate('decode', records),
+                           args)
+    return write_output(o, args, stream)
+
+
+def write_output(o, args, stream=None):
+    """Serializes the converted ontology to the given output stream, or to
+    the output opened here, and publishes it to the triple store if one is
+    given on the command line
+    """
+    instrumentation = o.instrumentation
+    o.flush()
+    if o.index is not None:
+        report_index(o.index, instrumentation)
+    instrumentation.count('triples', len(o.graph))
+    with instrumentation.stage('serialize'):
+        if stream is not None:
+            o.serialize(stream, args.format)
+        elif args.output is not None or args.publish is None:
+            with open_output(args) as stream:
+                o.serialize(stream, args.format)
+    if args.publish is not None:
+        with instrumentation.stage('publish'):
+            publish_graph(o, args)
+    return o
+
+
+def report_index(index, instrumentation):
+    """Logs and counts the repeated and conflicting entities found by the
+    entity index
+    """
+    logger.info("Skipped %d repeated entities, found %d conflicting "
+                "entities", index.repeats, index.conflicts)
+    instrumentation.count('repeated_entities', index.repeats)
+    instrumentation.count('conflicting_entities', index.conflicts)
+
+
+def publish_graph(o, args):
+    """Loads the graph of the ontology into the triple store given on the
+    command line. The HTTP stack is only imported when publishing.
+    """
+    from specimen2ccf.publish import publish
+    publish(o.graph, args)
+
+
+def run_incremental(inputs, args, instrumentation):
+    """Patches the previous output with only the donors that were added,
+    changed or removed since the previous run, according to the manifest
+    kept next to the output file
+    """
+    if args.output is None or args.stream_output:
+        raise ValueError("Incremental mode requires an output file and "
+                         "an in-memory graph")
+    if args.store is None and args.format not in ('ttl', 'nt', 'binary'):
+        raise ValueError("Incremental mode reloads the previous output, "
+                         "which requires the ttl, nt or binary format")
+    manifest_path = args.output + '.manifest.json'
+    previous = Manifest.load(manifest_path)
+    graph = open_graph(args)
+    try:
+        if args.store is None and previous.donors and exists(args.output):
+            # A persistent store already holds the previous graph
+            with instrumentation.stage('load'), \
+                    open_reader(args.output, args.compress) as fp:
+                graph.parse(fp, format=PLUGINS.get(args.format,
+                                                   args.format))
+        elif args.store is None:
+            previous = Manifest()
+
+        o = SCOntology.new(args.ontology_iri, graph, instrumentation,
+                           batch_size(args), on_invalid=args.on_invalid,
+                           index=new_index(args))
+        current = Manifest()
+        # The records are validated before they are hashed and walked, thus
+        # an invalid record is skipped or fails like in a full conversion
+        records = (obj for obj in read_records(inputs, args.stream_input)
+                   if o.validate(obj))
+        records = changed_records(records, previous, current, o.retract)
+        convert(o, records, args)
+    finally:
+        graph.close(commit_pending_transaction=True)
+    current.save(manifest_path)
 
-    o = SCOntology.new(args.ontology_iri)
-    for url in args.input_file:
-        data = json.load(open(url)) if is_local(url) \
-            else session.get(url).json()
-        o = o.mutate(data)
 
-    o.serialize(args.output)
+def run_sharded(inputs, args, instrumentation, tables):
+    """Converts the donor records into one output file per shard in the
+    output directory, e.g., one per consortium, and lists the shards in its
+    index.json manifest. Every shard is a complete ontology with the
+    header, thus any subset of the shards can be loaded on its own.
+    """
+    if args.output is None:
+        raise ValueError("Sharded output requires an output directory")
+    if args.incremental or args.store is not None:
+        raise ValueError("Sharded output cannot be combined with "
+                         "incremental mode or a persistent store")
+    shards = ShardIndex(args.output, args.shard_by, args.format,
+                        args.compress)
+    # Validates and screens the records before they are routed, which
+    # keeps invalid records out of the shards and one entity index across
+    # all of them
+    router = SCOntology(None, instrumentation, on_invalid=args.on_invalid,
+                        index=new_index(args))
+    records = instrumentation.iterate(
+        'decode', read_records(inputs, args.stream_input))
+    if args.stream_output:
+        write_shards(router, records, shards, args, tables)
+    else:
+        convert_shards(router, records, shards, args, tables)
+    if router.index is not None:
+        report_index(router.index, instrumentation)
+    instrumentation.count('shards', len(shards.shards))
+    instrumentation.count('triples', sum(shard['triples'] for shard
+                                         in shards.shards.values()))
+    shards.save()
+
+
+def write_shards(router, records, shards, args, tables):
+    """Streams the triples of every record to the output of its shard,
+    opening the output when the first record of the shard is read
+    """
+    instrumentation = router.instrumentation
+    with ExitStack() as outputs:
+        streams = {}
+        ontologies = {}
+        with instrumentation.stage('mutate'):
+            for obj in records:
+                if not router.validate(obj):
+                    continue
+                key = shard_key(obj, args.shard_by)
+                o = ontologies.get(key)
+                if o is None:
+                    stream = streams[key] = outputs.enter_context(
+                        open_writer(shards.path(key), args.compress))
+                    writer = new_writer(args.format, stream,
+                                        graph_name(args))
+                    o = SCOntology.new(args.ontology_iri, writer,
+                                       instrumentation, batch_size(args),
+                                       tables, args.on_invalid, router.index)
+                ontologies[key] = o.mutate((obj,))
+                shards.count(key, donors=1)
+        with instrumentation.stage('serialize'):
+            for key, o in ontologies.items():
+                o.flush()
+                shards.count(key, triples=len(o.graph))
+                o.serialize(streams[key], args.format)
+
+
+def convert_shards(router, records, shards, args, tables):
+    """Groups the records by shard and converts and writes the shards
+    concurrently in worker processes, one shard per task
+    """
+    instrumentation = router.instrumentation
+    groups = {}
+    decisions = {}
+    with instrumentation.stage('route'):
+        for obj in records:
+            if not router.validate(obj):
+                continue
+            key = shard_key(obj, args.shard_by)
+            groups.setdefault(key, []).append(obj)
+            if router.index is not None:
+                decisions.setdefault(key, []).extend(
+                    router.index.screen(obj))
+    tasks = [(group, shards.path(key), args, decisions.get(key),
+              instrumentation.enabled, tables is not None)
+             for key, group in groups.items()]
+    with instrumentation.stage('shards'):
+        if args.jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(min(args.jobs, len(tasks))) as executor:
+                results = list(executor.map(convert_shard, *zip(*tasks)))
+        else:
+            results = [convert_shard(*task) for task in tasks]
+    for key, (triples, report, rows) in zip(groups, results):
+        shards.count(key, donors=len(groups[key]), triples=triples)
+        if report is not None:
+            instrumentation.merge(report)
+        if rows is not None:
+            tables.extend(rows)
+
+
+def convert_shard(records, path, args, decisions=None, instrumented=False,
+                  tabulated=False):
+    """Converts the records of one shard and writes them to the given
+    path. Returns the number of triples, along with the instrumentation
+    report and the table rows if requested. Runs in a worker process.
+    """
+    instrumentation = Instrumentation() if instrumented \
+        else NO_INSTRUMENTATION
+    tables = SpecimenTables() if tabulated else None
+    index = ScreenedIndex(decisions) if decisions is not None else None
+    graph = open_graph(args)
+    try:
+        o = SCOntology.new(args.ontology_iri, graph, instrumentation,
+                           batch_size(args), tables, args.on_invalid, index)
+        with instrumentation.stage('mutate'):
+            o = o.mutate(records)
+        o.flush()
+        triples = len(graph)
+        with instrumentation.stage('serialize'), \
+                open_writer(path, args.compress) as stream:
+            o.serialize(stream, args.format)
+    finally:
+        graph.close()
+    return (triples,
+            instrumentation.report() if instrumented else None,
+            tables.rows if tabulated else None)
+
+
+def mutate_records(o, records, args):
+    """Mutates the ontology with the given specimen records, either in this
+    process or in a pool of worker processes
+    """
+    if args.jobs > 1:
+        return mutate_parallel(o, records, args.jobs, args.chunk_size)
+    return o.mutate(records)
+
+
+def mutate_parallel(o, records, jobs, chunk_size):
+    """Converts chunks of donor records in worker processes and merges the
+    resulting triples into the ontology. At most two chunks per worker are
+    in flight, which keeps the memory use of the parent bounded.
+    """
+    with ProcessPoolExecutor(jobs) as executor:
+        # The chunks are merged in the order they were submitted, thus the
+        # output does not depend on which worker finishes first
+        pending = deque()
+        for chunk in iter_chunks(records, chunk_size):
+            decisions = None
+            if o.index is not None:
+                chunk, decisions = screen_records(o, chunk)
+            if len(pending) >= 2 * jobs:
+                _merge(o, (pending.popleft(),))
+            pending.append(executor.submit(convert_records, chunk,
+                                           o.instrumentation.enabled,
+                                           o.tables is not None,
+                                           o.on_invalid, decisions))
+        _merge(o, pending)
+    return o
+
+
+def screen_records(o, records):
+    """Validates the records and runs them through the entity index of the
+    ontology in the parent process, so that the index covers the records
+    of every worker. Returns the valid records and the decisions of the
+    index, which the worker replays.
+    """
+    with o.instrumentation.stage('screen'):
+        records = [obj for obj in records if o.validate(obj)]
+        decisions = [admitted for obj in records
+                     for admitted in o.index.screen(obj)]
+    return records, decisions
+
+
+def convert_records(records, instrumented=False, tabulated=False,
+                    on_invalid=FAIL, decisions=None):
+    """Converts the specimen records and returns their triples, along with
+    the instrumentation report and the table rows if requested. Runs in a
+    worker process. The triples are never inserted into a graph here, the
+    parent does that once when merging them.
+    """
+    instrumentation = Instrumentation() if instrumented \
+        else NO_INSTRUMENTATION
+    tables = SpecimenTables() if tabulated else None
+    index = ScreenedIndex(decisions) if decisions is not None else None
+    o = SCOntology(Graph(), instrumentation, batch_size=None, tables=tables,
+                   on_invalid=on_invalid, index=index).mutate(records)
+    return (o.pending,
+            instrumentation.report() if instrumented else None,
+            tables.rows if tabulated else None)
+
+
+def add_converted(o, triples, rows=None):
+    """Adds the triples and the table rows converted by convert_records to
+    the ontology and commits them
+    """
+    o.graph.addN((s, p, obj, o.graph) for s, p, obj in triples)
+    o.commit()
+    if rows is not None:
+        o.tables.extend(rows)
+
+
+def _merge(o, futures):
+    with o.instrumentation.stage('merge'):
+        for future in futures:
+            triples, report, rows = future.result()
+            add_converted(o, triples, rows)
+            if report is not None:
+                o.instrumentation.merge(report)
+
+
+def read_records(paths, stream_input):
+    """Yields the specimen records of every local input in order
+    """
+    for path in paths:
+        with open(path) as fp:
+            if stream_input:
+                yield from RecordReader(fp)
+            else:
+                data = json.load(fp)
+                yield from data['@graph'] if isinstance(data, dict) else data
+
+
+def fetch_remote(urls, cache_dir, args):
+    """Downloads the remote inputs into the cache directory and returns a
+    mapping from each URL to its local path
+    """
+    if not urls:
+        return {}
+    from specimen2ccf.fetch import fetch_all
+    return fetch_all(urls, open_fetch(cache_dir, args))
+
+
+def open_fetch(cache_dir, args):
+    """Returns the function that downloads a remote input into the cache
+    directory and returns its local path. The HTTP stack is only imported
+    if there is anything to download.
+    """
+    from specimen2ccf.fetch import HTTPCache, new_session, new_fetch
+    return new_fetch(HTTPCache(cache_dir), new_session(args.retries),
+                     args.timeout)
+
+
+def open_cache_dir(path):
+    """Returns the cache directory for the remote inputs, or a temporary
+    directory that is removed after the run if no path is given
+    """
+    if path is None:
+        return tempfile.TemporaryDirectory(prefix='specimen2ccf-')
+    return nullcontext(path)
+
+
+def open_output(args):
+    """Opens the output file, or the standard output if no path is given,
+    as a binary stream that applies the requested compression
+    """
+    return open_writer(args.output, args.compress)
 
 
 def is_local(url):
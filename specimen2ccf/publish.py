@@ -0,0 +1,147 @@
+import io
+import uuid
+import logging
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from specimen2ccf.chunks import iter_chunks
+from specimen2ccf.fetch import new_session
+from specimen2ccf.writer import NTriplesWriter
+
+
+logger = logging.getLogger(__name__)
+
+# Number of triples per uploaded N-Triples document
+CHUNK_SIZE = 50000
+
+# Number of concurrent uploads, each over a connection of the shared pool
+MAX_UPLOADS = 4
+
+
+class GraphStore:
+    """SPARQL Graph Store
+    Loads graphs into a triple store over the SPARQL 1.1 Graph Store HTTP
+    Protocol. A graph is uploaded as N-Triples documents of chunk_size
+    triples each, concurrently over the pooled connections of one session.
+
+    If the SPARQL 1.1 Update endpoint of the store is given, the graph is
+    uploaded into a temporary named graph first, which then replaces the
+    previous version with a single MOVE operation, thus readers never see
+    a partial graph. The load only succeeds once the store reports the
+    named graph and no longer the temporary one. Otherwise the graph is
+    uploaded into its named graph directly.
+
+    The ontology has no blank nodes, which would not be shared between the
+    documents of two chunks.
+    """
+    def __init__(self, endpoint, update_endpoint=None, session=None,
+                 timeout=None, chunk_size=CHUNK_SIZE, uploads=MAX_UPLOADS):
+        self.endpoint = endpoint
+        self.update_endpoint = update_endpoint
+        self.session = session or new_session(pool_size=uploads)
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.uploads = uploads
+
+    def load(self, triples, graph_iri):
+        """Replaces the named graph with the given triples, returning the
+        number of triples uploaded
+        """
+        if self.update_endpoint is None:
+            logger.warning("No update endpoint, uploading into <%s> "
+                           "without an atomic swap", graph_iri)
+            return self.upload(triples, graph_iri)
+        staging_iri = '%s-staging-%s' % (graph_iri, uuid.uuid4().hex)
+        try:
+            count = self.upload(triples, staging_iri)
+            self.update('MOVE GRAPH <%s> TO GRAPH <%s>' % (
+                staging_iri, graph_iri))
+            # Some stores acknowledge an update that they did not apply
+            if self.exists(staging_iri) or not self.exists(graph_iri):
+                raise ValueError("The store did not move the temporary "
+                                 "graph <" + staging_iri + "> to <" +
+                                 graph_iri + ">")
+        except BaseException:
+            self._drop(staging_iri)
+            raise
+        logger.info("Loaded %d triples into <%s>", count, graph_iri)
+        return count
+
+    def upload(self, triples, graph_iri):
+        """Replaces the named graph with the first chunk of the triples and
+        appends the other chunks concurrently
+        """
+        chunks = iter_chunks(triples, self.chunk_size)
+        first = next(chunks, [])
+        self._send('PUT', graph_iri, first)
+        count = len(first)
+        with ThreadPoolExecutor(self.uploads) as executor:
+            pending = set()
+            for chunk in chunks:
+                if len(pending) >= 2 * self.uploads:
+                    done, pending = wait(pending,
+                                         return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(self._send, 'POST', graph_iri,
+                                            chunk))
+                count += len(chunk)
+            for future in wait(pending).done:
+                future.result()
+        return count
+
+    def update(self, operation):
+        """Runs the SPARQL Update operation on the update endpoint
+        """
+        response = self.session.post(
+            self.update_endpoint, data=operation.encode('utf-8'),
+            headers={'Content-Type': 'application/sparql-update'},
+            timeout=self.timeout)
+        response.raise_for_status()
+
+    def exists(self, graph_iri):
+        """Returns whether the store has the named graph
+        """
+        response = self.session.head(self.endpoint,
+                                     params={'graph': graph_iri},
+                                     timeout=self.timeout)
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    def _send(self, method, graph_iri, triples):
+        response = self.session.request(
+            method, self.endpoint, params={'graph': graph_iri},
+            data=_ntriples(triples),
+            headers={'Content-Type': 'application/n-triples'},
+            timeout=self.timeout)
+        response.raise_for_status()
+
+    def _drop(self, graph_iri):
+        try:
+            response = self.session.delete(self.endpoint,
+                                           params={'graph': graph_iri},
+                                           timeout=self.timeout)
+            if response.status_code != 404:
+                response.raise_for_status()
+        except Exception as e:
+            logger.warning("Could not drop the temporary graph <%s>: %s",
+                           graph_iri, e)
+
+
+def publish(graph, args):
+    """Loads the converted graph into the store given on the command line
+    """
+    store = GraphStore(args.publish, args.update_endpoint,
+                       new_session(args.retries, MAX_UPLOADS), args.timeout,
+                       args.upload_chunk_size)
+    return store.load(graph, args.graph_iri or args.ontology_iri)
+
+
+def _ntriples(triples):
+    stream = io.BytesIO()
+    writer = NTriplesWriter(stream)
+    writer.addN((s, p, o, None) for s, p, o in triples)
+    writer.serialize()
+    return stream.getvalue()
@@ -0,0 +1,114 @@
+import json
+
+
+class RecordReader:
+    """Incremental JSON-LD Reader
+    Walks the `@graph` array of a HuBMAP specimen export and yields the
+    donor records one at a time, so that only a single record needs to be
+    held in memory while the rest of the document is still on disk or on
+    the wire. A bare top-level array of records is accepted as well.
+    """
+    def __init__(self, fp, chunk_size=65536):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def __iter__(self):
+        c = self._peek_char()
+        if c == '[':
+            yield from self._iter_array()
+        elif c == '{':
+            found = False
+            for key in self._iter_keys():
+                if key == '@graph':
+                    found = True
+                    yield from self._iter_array()
+                else:
+                    self._decode_value()  # e.g. @context, not needed
+            if not found:
+                raise KeyError('@graph')
+        else:
+            raise ValueError("Expecting a JSON object or array, found <" +
+                             c + ">")
+
+    def _iter_keys(self):
+        self._consume('{')
+        if self._peek_char() == '}':
+            self._consume('}')
+            return
+        while True:
+            key = self._decode_value()
+            self._consume(':')
+            yield key
+            c = self._next_char()
+            if c == '}':
+                return
+            if c != ',':
+                raise ValueError("Expecting ',' delimiter, found <" + c + ">")
+
+    def _iter_array(self):
+        self._consume('[')
+        if self._peek_char() == ']':
+            self._consume(']')
+            return
+        while True:
+            yield self._decode_value()
+            c = self._next_char()
+            if c == ']':
+                return
+            if c != ',':
+                raise ValueError("Expecting ',' delimiter, found <" + c + ">")
+
+    def _decode_value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number or literal that ends the buffer may continue in
+                # the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the buffer geometrically to avoid re-decoding a large
+            # record too many times
+            self._fill(max(self.chunk_size, len(self.buffer) - self.pos))
+
+    def _consume(self, expected):
+        c = self._next_char()
+        if c != expected:
+            raise ValueError("Expecting <" + expected + ">, found <" +
+                             c + ">")
+
+    def _next_char(self):
+        c = self._peek_char()
+        self.pos += 1
+        return c
+
+    def _peek_char(self):
+        self._skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise ValueError("Unexpected end of JSON input")
+        return self.buffer[self.pos]
+
+    def _skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buffer) and \
+                    self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return
+            self._fill(self.chunk_size)
+
+    def _fill(self, size):
+        chunk = self.fp.read(size)
+        if not chunk:
+            self.eof = True
+            return
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
@@ -0,0 +1,133 @@
+import io
+import json
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from specimen2ccf.ontology import SCOntology, ontology_header
+from specimen2ccf.writer import new_writer
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    'ttl': 'text/turtle; charset=utf-8',
+    'nt': 'application/n-triples; charset=utf-8',
+    'nquads': 'application/n-quads; charset=utf-8',
+    'binary': 'application/octet-stream'
+}
+
+
+class Converter:
+    """Warm Converter
+    Holds the shared header of the ontology, so that converting a specimen
+    payload only costs the conversion of its records
+    """
+    def __init__(self, ontology_iri):
+        self.header = ontology_header(ontology_iri)
+
+    def convert(self, data, format='ttl'):
+        """Converts the JSON-LD specimen payload and returns the ontology,
+        encoded in the given format, as bytes
+        """
+        stream = io.BytesIO()
+        writer = new_writer(format, stream, self.header.ontology_iri)
+        self.header.write(writer)
+        SCOntology(writer).mutate(data).serialize(None, format)
+        return stream.getvalue()
+
+    def convert_many(self, payloads, format='ttl'):
+        """Yields the ontology of every one of the independent JSON-LD
+        specimen payloads, encoded in the given format, as bytes
+        """
+        for data in payloads:
+            yield self.convert(data, format)
+
+
+_converter = None
+
+
+def _init_worker(ontology_iri):
+    global _converter
+    _converter = Converter(ontology_iri)
+
+
+def _convert(body, format):
+    return _converter.convert(json.loads(body), format)
+
+
+class ConversionServer(ThreadingHTTPServer):
+    """Conversion Service
+    A local HTTP server that converts the JSON-LD specimen payloads POSTed
+    to /convert. The conversions run in a pool of warm worker processes,
+    which bounds the number of concurrent conversions.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, ontology_iri, workers=1, format='ttl'):
+        super().__init__(address, ConversionRequestHandler)
+        self.format = format
+        self.executor = ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(ontology_iri,))
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown()
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/health':
+            self._respond(200, 'text/plain; charset=utf-8', b'ok\n')
+        else:
+            self._respond(404, 'text/plain; charset=utf-8', b'Not found\n')
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/convert':
+            self._respond(404, 'text/plain; charset=utf-8', b'Not found\n')
+            return
+        format = parse_qs(url.query).get('format', [self.server.format])[0]
+        if format not in CONTENT_TYPES:
+            self._respond(400, 'text/plain; charset=utf-8',
+                          b'Unsupported format\n')
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        try:
+            output = self.server.executor.submit(_convert, body,
+                                                 format).result()
+        except (ValueError, KeyError, TypeError) as e:
+            message = 'Invalid specimen data: %r\n' % (e,)
+            self._respond(400, 'text/plain; charset=utf-8',
+                          message.encode('utf-8'))
+            return
+        self._respond(200, CONTENT_TYPES[format], output)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def _respond(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(args):
+    """Runs the conversion service on the address given on the command line
+    until it is interrupted
+    """
+    host, _, port = args.serve.rpartition(':')
+    server = ConversionServer((host or 'localhost', int(port)),
+                              args.ontology_iri, args.jobs, args.format)
+    logger.info("Serving on http://%s:%d/convert", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,102 @@
+import json
+import os
+import re
+
+from os.path import join
+
+
+# Fields of a donor record that the shards are keyed by, in order of
+# preference
+KEYS = {
+    'consortium': ('consortium_name',),
+    'provider': ('provider_name', 'provider_uuid')
+}
+
+EXTENSIONS = {
+    'ttl': '.ttl',
+    'nt': '.nt',
+    'nquads': '.nq',
+    'json-ld': '.jsonld',
+    'binary': '.scrdf'
+}
+
+COMPRESSION_EXTENSIONS = {
+    'gzip': '.gz',
+    'zstd': '.zst'
+}
+
+# Key of the shard of the donors that have none of the key fields
+UNKNOWN = 'unknown'
+
+INDEX_FILE = 'index.json'
+
+
+def shard_key(obj, shard_by):
+    """Returns the key of the shard that the donor record belongs to
+    """
+    for field in KEYS[shard_by]:
+        value = obj.get(field)
+        if isinstance(value, str) and value:
+            return value
+    return UNKNOWN
+
+
+class ShardIndex:
+    """Shard Index
+    Keeps the file name and the donor and triple counts of every shard of
+    an output directory, and saves them as the index.json manifest that
+    loaders read to fetch only the shards they need
+    """
+    def __init__(self, directory, shard_by, format, compression=None):
+        if shard_by not in KEYS:
+            raise ValueError("Unsupported shard key <" + shard_by + ">")
+        self.directory = directory
+        self.shard_by = shard_by
+        self.format = format
+        self.compression = compression
+        self.shards = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        """Returns the path of the file of the given shard, named after a
+        slug of its key that is unique in the directory
+        """
+        shard = self.shards.get(key)
+        if shard is None:
+            shard = self.shards[key] = {
+                'key': key,
+                'path': self._file_name(key),
+                'donors': 0,
+                'triples': 0
+            }
+        return join(self.directory, shard['path'])
+
+    def count(self, key, donors=0, triples=0):
+        shard = self.shards[key]
+        shard['donors'] += donors
+        shard['triples'] += triples
+
+    def save(self):
+        path = join(self.directory, INDEX_FILE)
+        part_path = path + '.part'
+        with open(part_path, 'w') as f:
+            json.dump({
+                'shard_by': self.shard_by,
+                'format': self.format,
+                'compression': self.compression,
+                'shards': sorted(self.shards.values(),
+                                 key=lambda shard: shard['path'])
+            }, f, indent=2)
+        os.replace(part_path, path)
+
+    def _file_name(self, key):
+        slug = re.sub(r'[^A-Za-z0-9._-]+', '-', key).strip('-.') or UNKNOWN
+        extension = EXTENSIONS.get(self.format, '.' + self.format) + \
+            COMPRESSION_EXTENSIONS.get(self.compression, '')
+        taken = {shard['path'] for shard in self.shards.values()}
+        name = slug + extension
+        suffix = 1
+        while name in taken:
+            suffix += 1
+            name = '%s-%d%s' % (slug, suffix, extension)
+        return name
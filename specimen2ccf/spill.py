@@ -0,0 +1,207 @@
+import os
+import re
+import heapq
+import pickle
+import tempfile
+
+from itertools import islice
+from os.path import join
+
+from specimen2ccf.terms import encode_term, decode_term
+from specimen2ccf.writer import PLUGINS, new_writer
+
+
+# Number of added triples between two checks of the memory use
+CHECK_INTERVAL = 4096
+
+# Least number of buffered triples that are spilled as one run, which
+# keeps the runs from getting tiny when the memory freed by a spill is not
+# returned to the operating system
+MIN_RUN_SIZE = 65536
+
+# Number of sorted triples per pickled block of a run file
+BLOCK_SIZE = 8192
+
+# Largest number of runs that are merged at once. Once there are as many
+# runs, they are merged into a single one, which bounds the open files.
+MERGE_FAN_IN = 64
+
+_SIZE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$', re.IGNORECASE)
+
+_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+
+def parse_size(text):
+    """Returns the number of bytes of a size like '512M' or '2G'
+    """
+    match = _SIZE.match(text)
+    if match is None:
+        raise ValueError("Invalid memory size <" + text + ">")
+    number, unit = match.groups()
+    return int(float(number) * _UNITS[unit.upper()])
+
+
+def current_rss():
+    """Returns the resident set size of this process in bytes, or its peak
+    if the current one is not available on the platform
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class SpillingGraph:
+    """Spilling Graph
+    A graph-like sink for SCOntology that keeps the memory use of the
+    process below a budget. The triples are buffered as encoded keys, and
+    whenever the resident set size exceeds the budget the buffer is sorted
+    and spilled to a run file in a temporary directory. Serialization does
+    an external merge of the runs and the buffer, which drops duplicate
+    triples and groups the triples by subject, and writes them with one of
+    the streaming writers.
+
+    The memory use is checked every CHECK_INTERVAL triples, thus it can
+    exceed the budget by about that many triples.
+    """
+    def __init__(self, max_memory, identifier=None, directory=None):
+        self.max_memory = max_memory
+        self.identifier = identifier
+        self.namespaces = {}
+        self.buffer = set()
+        self.runs = []
+        self.count = 0
+        self.unchecked = 0
+        self.spills = 0
+        self.tmp = tempfile.TemporaryDirectory(prefix='specimen2ccf-spill-',
+                                               dir=directory)
+
+    def __len__(self):
+        """Returns the number of distinct triples in the buffer and the
+        runs, which counts the triples repeated across runs more than once
+        until they are merged
+        """
+        return self.count + len(self.buffer)
+
+    def __iter__(self):
+        """Yields every distinct triple, grouped by subject
+        """
+        decode = _Decoder()
+        for s, p, o in self.triples():
+            yield decode(s), decode(p), decode(o)
+
+    def bind(self, prefix, namespace):
+        self.namespaces[prefix] = namespace
+
+    def add(self, triple):
+        self.addN((triple + (self,),))
+
+    def addN(self, quads):
+        buffer = self.buffer
+        for s, p, o, _ in quads:
+            buffer.add((encode_term(s), encode_term(p), encode_term(o)))
+            self.unchecked += 1
+            if self.unchecked >= CHECK_INTERVAL:
+                self.unchecked = 0
+                if len(buffer) >= MIN_RUN_SIZE and \
+                        current_rss() > self.max_memory:
+                    self.spill()
+                    buffer = self.buffer
+
+    def spill(self):
+        """Writes the buffered triples to a new sorted run
+        """
+        if not self.buffer:
+            return
+        if len(self.runs) >= MERGE_FAN_IN:
+            self._compact()
+        run = sorted(self.buffer)
+        self.buffer = set()
+        self.count += self._write_run(iter(run))
+
+    def triples(self):
+        """Returns every distinct triple as encoded keys, sorted and thus
+        grouped by subject
+        """
+        return _dedup(heapq.merge(sorted(self.buffer),
+                                  *map(_read_run, self.runs)))
+
+    def serialize(self, destination=None, format='ttl', **kwargs):
+        """Writes the merged triples to the destination, a binary stream,
+        in one of the formats of the streaming writers
+        """
+        formats = {name: format for format, name in PLUGINS.items()}
+        writer = new_writer(formats.get(format, format), destination,
+                            self.identifier)
+        for prefix, namespace in self.namespaces.items():
+            writer.bind(prefix, namespace)
+        writer.addN((s, p, o, None) for s, p, o in self)
+        writer.serialize()
+
+    def close(self, commit_pending_transaction=False):
+        """Removes the run files
+        """
+        self.buffer = set()
+        self.runs = []
+        self.tmp.cleanup()
+
+    def _compact(self):
+        """Merges all runs into a single one
+        """
+        runs = self.runs
+        self.runs = []
+        self.count = self._write_run(_dedup(heapq.merge(*map(_read_run,
+                                                             runs))))
+        for path in runs:
+            os.remove(path)
+
+    def _write_run(self, keys):
+        self.spills += 1
+        path = join(self.tmp.name, 'run-%d' % self.spills)
+        count = 0
+        with open(path, 'wb') as f:
+            while True:
+                block = list(islice(keys, BLOCK_SIZE))
+                if not block:
+                    break
+                pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+                count += len(block)
+        self.runs.append(path)
+        return count
+
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                return
+
+
+def _dedup(keys):
+    previous = None
+    for key in keys:
+        if key != previous:
+            yield key
+            previous = key
+
+
+class _Decoder:
+    """Decodes the keys of the merged triples, reusing the term of a key
+    that repeats in consecutive triples, e.g., the subject
+    """
+    def __init__(self):
+        self.terms = {}
+
+    def __call__(self, key):
+        term = self.terms.get(key)
+        if term is None:
+            if len(self.terms) >= BLOCK_SIZE:
+                self.terms.clear()
+            term = self.terms[key] = decode_term(key)
+        return term
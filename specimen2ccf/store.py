@@ -0,0 +1,144 @@
+import sqlite3
+
+from os.path import exists
+from rdflib import plugin, URIRef
+from rdflib.store import Store, VALID_STORE, NO_STORE
+
+from specimen2ccf.terms import encode_term, decode_term
+
+
+class SQLiteStore(Store):
+    """SQLite Triple Store
+    A disk-backed rdflib store for graphs that do not fit in memory. Every
+    term is kept as a single text key, and the triples table is indexed by
+    subject, predicate and object. Changes are committed in transactions,
+    so an interrupted conversion leaves the last committed state behind,
+    and a later run can reopen the store and extend it.
+
+    >>> from rdflib import Graph
+    >>> g = Graph(store='SQLite')
+    >>> g.open('specimens.db', create=True)
+    """
+    context_aware = False
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None):
+        super().__init__(configuration, identifier)
+        self.connection = None
+
+    def open(self, configuration, create=False):
+        if not create and not exists(configuration):
+            return NO_STORE
+        self.connection = sqlite3.connect(configuration)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.executescript(_SCHEMA)
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        if self.connection is None:
+            return
+        if commit_pending_transaction:
+            self.connection.commit()
+        else:
+            self.connection.rollback()
+        self.connection.close()
+        self.connection = None
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def add(self, triple, context, quoted=False):
+        self.connection.execute(
+            "INSERT OR IGNORE INTO triples VALUES (?, ?, ?)",
+            [encode_term(term) for term in triple])
+
+    def addN(self, quads):
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO triples VALUES (?, ?, ?)",
+            ((encode_term(s), encode_term(p), encode_term(o))
+             for s, p, o, c in quads))
+
+    def remove(self, triple, context=None):
+        where, values = _where(triple)
+        self.connection.execute("DELETE FROM triples" + where, values)
+
+    def triples(self, triple_pattern, context=None):
+        where, values = _where(triple_pattern)
+        cursor = self.connection.execute(
+            "SELECT s, p, o FROM triples" + where, values)
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            for s, p, o in rows:
+                triple = decode_term(s), decode_term(p), decode_term(o)
+                yield triple, iter(())
+
+    def __len__(self, context=None):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace):
+        self.connection.execute(
+            "DELETE FROM namespaces WHERE namespace = ?", (str(namespace),))
+        self.connection.execute(
+            "INSERT OR REPLACE INTO namespaces VALUES (?, ?)",
+            (prefix, str(namespace)))
+
+    def prefix(self, namespace):
+        row = self.connection.execute(
+            "SELECT prefix FROM namespaces WHERE namespace = ?",
+            (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespace(self, prefix):
+        row = self.connection.execute(
+            "SELECT namespace FROM namespaces WHERE prefix = ?",
+            (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def namespaces(self):
+        rows = self.connection.execute(
+            "SELECT prefix, namespace FROM namespaces").fetchall()
+        for prefix, namespace in rows:
+            yield prefix, URIRef(namespace)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS triples (
+    s TEXT NOT NULL,
+    p TEXT NOT NULL,
+    o TEXT NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_po ON triples (p, o);
+CREATE INDEX IF NOT EXISTS triples_o ON triples (o);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL
+);
+"""
+
+
+def _where(pattern):
+    clauses, values = [], []
+    for column, term in zip('spo', pattern):
+        if term is not None:
+            clauses.append(column + ' = ?')
+            values.append(encode_term(term))
+    if not clauses:
+        return '', values
+    return ' WHERE ' + ' AND '.join(clauses), values
+
+
+plugin.register('SQLite', Store, 'specimen2ccf.store', 'SQLiteStore')
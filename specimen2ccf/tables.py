@@ -0,0 +1,188 @@
+import os
+
+from os.path import join
+
+
+# Columns and Arrow types of every table. The values are the ones that the
+# ontology extracts from the specimen records.
+SCHEMAS = {
+    'donors': (
+        ('id', 'string'),
+        ('label', 'string'),
+        ('description', 'string'),
+        ('link', 'string'),
+        ('age', 'int64'),
+        ('sex', 'string'),
+        ('bmi', 'float64'),
+        ('consortium_name', 'string'),
+        ('provider_name', 'string'),
+        ('provider_uuid', 'string')
+    ),
+    'tissue_blocks': (
+        ('id', 'string'),
+        ('donor_id', 'string'),
+        ('rui_location_id', 'string'),
+        ('label', 'string'),
+        ('description', 'string'),
+        ('link', 'string'),
+        ('section_count', 'int64'),
+        ('section_size', 'int64'),
+        ('section_units', 'string')
+    ),
+    'tissue_sections': (
+        ('id', 'string'),
+        ('tissue_block_id', 'string'),
+        ('donor_id', 'string'),
+        ('label', 'string'),
+        ('description', 'string'),
+        ('link', 'string'),
+        ('section_number', 'int64')
+    ),
+    'datasets': (
+        ('id', 'string'),
+        ('sample_id', 'string'),
+        ('donor_id', 'string'),
+        ('label', 'string'),
+        ('description', 'string'),
+        ('link', 'string'),
+        ('technology', 'string'),
+        ('thumbnail', 'string')
+    )
+}
+
+FORMATS = {
+    'arrow': '.arrow',
+    'parquet': '.parquet'
+}
+
+# Number of buffered rows per table after which they are written as one
+# record batch
+BATCH_SIZE = 65536
+
+_COERCE = {
+    'string': str,
+    'int64': int,
+    'float64': float
+}
+
+
+class SpecimenTables:
+    """Specimen Tables
+    Collects flat rows of the donors, tissue blocks, tissue sections and
+    datasets next to the ontology graph. If a directory is given, the rows
+    are written there in batches as one Arrow IPC file, which can be memory
+    mapped, or one Parquet file per table. Without a directory the rows are
+    only buffered, e.g., in a worker process that returns them to the
+    parent.
+    """
+    def __init__(self, directory=None, format='arrow', batch_size=BATCH_SIZE):
+        self.directory = directory
+        self.format = format
+        self.batch_size = batch_size
+        self.rows = {name: [] for name in SCHEMAS}
+        self.writers = {}
+        self.files = []
+        if directory is not None:
+            if format not in FORMATS:
+                raise ValueError("Unsupported table format <" + format + ">")
+            self.pyarrow = import_pyarrow()
+            os.makedirs(directory, exist_ok=True)
+
+    def add_donor(self, obj):
+        self._add('donors', (
+            obj['@id'], obj['label'], obj['description'], obj['link'],
+            obj.get('age'), obj.get('sex'), obj.get('bmi'),
+            obj['consortium_name'], obj.get('provider_name'),
+            obj.get('provider_uuid')))
+
+    def add_tissue_block(self, obj, donor_id):
+        self._add('tissue_blocks', (
+            obj['@id'], donor_id, obj['rui_location']['@id'], obj['label'],
+            obj['description'], obj['link'], obj['section_count'],
+            obj['section_size'], obj['section_units']))
+
+    def add_tissue_section(self, obj, tissue_block_id, donor_id):
+        self._add('tissue_sections', (
+            obj['@id'], tissue_block_id, donor_id, obj['label'],
+            obj['description'], obj['link'], obj['section_number']))
+
+    def add_dataset(self, obj, sample_id, donor_id):
+        self._add('datasets', (
+            obj['@id'], sample_id, donor_id, obj['label'],
+            obj['description'], obj['link'], obj['technology'],
+            obj['thumbnail']))
+
+    def extend(self, rows):
+        """Adds the rows collected by another instance, e.g., in a worker
+        process
+        """
+        for name, table_rows in rows.items():
+            self.rows[name].extend(table_rows)
+            self._check(name)
+
+    def close(self):
+        """Writes the remaining rows and completes the files. Every table
+        gets a file, even if it has no rows.
+        """
+        if self.directory is None:
+            return
+        for name in SCHEMAS:
+            if self.rows[name] or name not in self.writers:
+                self._write_batch(name)
+            self.writers.pop(name).close()
+        for f in self.files:
+            f.close()
+        self.files = []
+
+    def _add(self, name, row):
+        self.rows[name].append(row)
+        self._check(name)
+
+    def _check(self, name):
+        if len(self.rows[name]) >= self.batch_size and \
+                self.directory is not None:
+            self._write_batch(name)
+
+    def _write_batch(self, name):
+        pa = self.pyarrow
+        schema = self._schema(name)
+        columns = list(zip(*self.rows[name])) or [()] * len(SCHEMAS[name])
+        arrays = [pa.array([None if value is None else _COERCE[type](value)
+                            for value in values], schema.field(i).type)
+                  for i, ((_, type), values) in
+                  enumerate(zip(SCHEMAS[name], columns))]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+        writer = self.writers.get(name)
+        if writer is None:
+            writer = self.writers[name] = self._open(name, schema)
+        if self.format == 'parquet':
+            writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            writer.write_batch(batch)
+        self.rows[name] = []
+
+    def _open(self, name, schema):
+        path = join(self.directory, name + FORMATS[self.format])
+        if self.format == 'parquet':
+            import pyarrow.parquet
+            return pyarrow.parquet.ParquetWriter(path, schema)
+        sink = self.pyarrow.OSFile(path, 'wb')
+        self.files.append(sink)
+        return self.pyarrow.ipc.new_file(sink, schema)
+
+    def _schema(self, name):
+        pa = self.pyarrow
+        return pa.schema([(column, getattr(pa, type)())
+                          for column, type in SCHEMAS[name]])
+
+
+def import_pyarrow():
+    """Returns the optional pyarrow module
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ImportError("Table export requires the pyarrow "
+                          "package") from None
+    return pyarrow
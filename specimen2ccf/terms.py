@@ -0,0 +1,29 @@
+from rdflib import URIRef, BNode, Literal
+
+
+SEPARATOR = '\x1f'
+
+
+def encode_term(term):
+    """Returns the term as a single text key, which starts with the kind of
+    the term, i.e., 'U' for IRIs, 'B' for blank nodes and 'L' for literals
+    """
+    if isinstance(term, URIRef):
+        return 'U%s' % term
+    if isinstance(term, BNode):
+        return 'B%s' % term
+    if isinstance(term, Literal):
+        return 'L%s%s%s%s%s' % (
+            term.datatype or '', SEPARATOR, term.language or '', SEPARATOR,
+            term)
+    raise TypeError("Unsupported term <%r>" % (term,))
+
+
+def decode_term(key):
+    kind = key[0]
+    if kind == 'U':
+        return URIRef(key[1:])
+    if kind == 'B':
+        return BNode(key[1:])
+    datatype, language, value = key[1:].split(SEPARATOR, 2)
+    return Literal(value, lang=language or None, datatype=datatype or None)
@@ -0,0 +1,206 @@
+FAIL = 'fail'
+SKIP = 'skip'
+
+POLICIES = (FAIL, SKIP)
+
+
+class InvalidRecordError(ValueError):
+    """Raised for a donor record that does not validate, with every error
+    found in the record as a (path, message) pair
+    """
+    def __init__(self, donor_id, errors):
+        self.donor_id = donor_id
+        self.errors = errors
+        super().__init__("Invalid donor record <%s>: %s" % (
+            donor_id, '; '.join('%s: %s' % error for error in errors)))
+
+    def __reduce__(self):
+        return InvalidRecordError, (self.donor_id, self.errors)
+
+
+def _string(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise TypeError("expected a string")
+
+
+def _integer(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise TypeError("expected an integer")
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    raise TypeError("expected a number")
+
+
+def _reference(value):
+    if isinstance(value, dict) and isinstance(value.get('@id'), str):
+        return value
+    raise TypeError("expected an object with an @id")
+
+
+def _array(value):
+    if isinstance(value, list):
+        return value
+    raise TypeError("expected an array")
+
+
+# Fields of every kind of record as (name, required, coercion) triples.
+# Optional fields may be missing or null.
+SCHEMAS = {
+    'Donor': (
+        ('@id', True, _string),
+        ('label', True, _string),
+        ('description', True, _string),
+        ('link', True, _string),
+        ('age', False, _integer),
+        ('sex', False, _string),
+        ('bmi', False, _number),
+        ('consortium_name', True, _string),
+        ('provider_name', False, _string),
+        ('provider_uuid', False, _string),
+        ('samples', False, _array)
+    ),
+    'Tissue Block': (
+        ('@id', True, _string),
+        ('rui_location', True, _reference),
+        ('label', True, _string),
+        ('description', True, _string),
+        ('link', True, _string),
+        ('section_count', True, _integer),
+        ('section_size', True, _integer),
+        ('section_units', True, _string),
+        ('sections', False, _array),
+        ('datasets', False, _array)
+    ),
+    'Tissue Section': (
+        ('@id', True, _string),
+        ('label', True, _string),
+        ('description', True, _string),
+        ('link', True, _string),
+        ('section_number', True, _integer),
+        ('samples', False, _array),
+        ('datasets', False, _array)
+    ),
+    'Dataset': (
+        ('@id', True, _string),
+        ('label', True, _string),
+        ('description', True, _string),
+        ('link', True, _string),
+        ('technology', True, _string),
+        ('thumbnail', True, _string)
+    )
+}
+
+
+def _compile(fields):
+    """Returns a function that checks and coerces the fields of a record in
+    place, appending an error to the given list for every invalid field
+    """
+    required = tuple((name, coerce) for name, needed, coerce in fields
+                     if needed)
+    optional = tuple((name, coerce) for name, needed, coerce in fields
+                     if not needed)
+
+    def check(obj, path, errors):
+        for name, coerce in required:
+            value = obj.get(name)
+            if value is None:
+                errors.append((path + _key(name), "missing"))
+                continue
+            try:
+                obj[name] = coerce(value)
+            except TypeError as e:
+                errors.append((path + _key(name), str(e)))
+        for name, coerce in optional:
+            value = obj.get(name)
+            if value is not None:
+                try:
+                    obj[name] = coerce(value)
+                except TypeError as e:
+                    errors.append((path + _key(name), str(e)))
+    return check
+
+
+_CHECKS = {kind: _compile(fields) for kind, fields in SCHEMAS.items()}
+
+
+def _key(name):
+    return '.' + name if name.isidentifier() else "['%s']" % name
+
+
+def validate(donor):
+    """Checks the donor record and every sample and dataset below it in one
+    pass, following the same rules as the conversion, and coerces the
+    values of mistyped fields in place, e.g., a numeric string into an
+    integer. Returns the list of errors as (JSON path, message) pairs,
+    which is empty if the record is valid.
+    """
+    if not isinstance(donor, dict):
+        return [('$', "expected an object")]
+    errors = []
+    if donor.get('@type') != "Donor":
+        errors.append(('$' + _key('@type'), "expected 'Donor'"))
+        return errors
+    _CHECKS['Donor'](donor, '$', errors)
+    # Each frame is a list of samples with its path and whether a tissue
+    # block precedes the samples that are yet to be checked
+    stack = [(donor.get('samples'), '$.samples', False)]
+    while stack:
+        samples, path, has_tissue_block = stack.pop()
+        if not isinstance(samples, list):
+            continue
+        for i, sample in enumerate(samples):
+            sample_path = '%s[%d]' % (path, i)
+            if not isinstance(sample, dict):
+                errors.append((sample_path, "expected an object"))
+                continue
+            sample_type = sample.get('sample_type')
+            if sample_type == "Tissue Block":
+                has_tissue_block = True
+                _CHECKS[sample_type](sample, sample_path, errors)
+                stack.append((sample.get('sections'),
+                              sample_path + '.sections', True))
+            elif sample_type == "Tissue Section":
+                if not has_tissue_block:
+                    errors.append((sample_path, "tissue section has "
+                                                "missing tissue block"))
+                _CHECKS[sample_type](sample, sample_path, errors)
+                stack.append((sample.get('samples'),
+                              sample_path + '.samples', True))
+            elif not isinstance(sample_type, str):
+                errors.append((sample_path + '.sample_type', "missing"))
+                continue
+            else:
+                continue
+            datasets = sample.get('datasets')
+            if isinstance(datasets, list):
+                _check_datasets(datasets, sample_path + '.datasets', errors)
+    return errors
+
+
+def _check_datasets(datasets, path, errors):
+    check = _CHECKS['Dataset']
+    for i, dataset in enumerate(datasets):
+        dataset_path = '%s[%d]' % (path, i)
+        if isinstance(dataset, dict):
+            check(dataset, dataset_path, errors)
+        else:
+            errors.append((dataset_path, "expected an object"))
@@ -0,0 +1,209 @@
+import io
+import re
+
+from abc import ABC, abstractmethod
+from rdflib import plugin, URIRef, Literal, BNode
+from rdflib.parser import Parser
+from rdflib.serializer import Serializer
+
+
+# rdflib plugin names of the output formats that rdflib cannot write for a
+# plain Graph, which are registered at the end of this module. The binary
+# format can be parsed back, too.
+PLUGINS = {
+    'nquads': 'specimen2ccf-nquads',
+    'binary': 'specimen2ccf-binary'
+}
+
+
+class TripleWriter(ABC):
+    """Streaming Triple Writer
+    A write-only replacement for the rdflib Graph held by SCOntology. Every
+    added triple is written to the output stream straight away, so the
+    memory use stays flat regardless of the input size. Unlike a Graph, the
+    writer does not remove duplicate triples.
+
+    The stream is a binary stream, e.g., an open file, a compressing stream
+    or the buffer of the standard output, which receives UTF-8 text.
+    """
+    def __init__(self, stream):
+        self.stream = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        self.namespaces = {}
+        self.count = 0
+
+    def __len__(self):
+        """Returns the number of triples written so far
+        """
+        return self.count
+
+    def bind(self, prefix, namespace):
+        self.namespaces[str(namespace)] = prefix
+
+    @abstractmethod
+    def add(self, triple):
+        """Writes the triple to the output stream
+        """
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.add((s, p, o))
+
+    def serialize(self, destination=None, format=None, **kwargs):
+        """Completes the output document. The triples have already been
+        written to the stream given at construction, thus the destination
+        and format arguments are only accepted for compatibility with
+        rdflib.Graph.serialize(). The given stream is left open.
+        """
+        self.stream.flush()
+        self.stream.detach()
+
+
+class NTriplesWriter(TripleWriter):
+    """Writes one N-Triples line per added triple
+    """
+    def add(self, triple):
+        s, p, o = triple
+        self.stream.write('%s %s %s .\n' % (_term(s), _term(p), _term(o)))
+        self.count += 1
+
+
+class NQuadsWriter(NTriplesWriter):
+    """Writes one N-Quads line per added triple, all of them in the named
+    graph given at construction
+    """
+    def __init__(self, stream, graph_name):
+        super().__init__(stream)
+        self.graph_name = _term(graph_name)
+
+    def add(self, triple):
+        s, p, o = triple
+        self.stream.write('%s %s %s %s .\n' % (_term(s), _term(p), _term(o),
+                                               self.graph_name))
+        self.count += 1
+
+
+class TurtleWriter(TripleWriter):
+    """Writes subject-grouped Turtle
+    Consecutive triples about the same subject are written as a single
+    statement, which is the order in which SCOntology produces them for
+    each specimen record. A subject that reappears later simply starts a
+    new statement.
+    """
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.subject = None
+
+    def bind(self, prefix, namespace):
+        super().bind(prefix, namespace)
+        self._end_statement()
+        self.stream.write('@prefix %s: <%s> .\n' % (prefix, namespace))
+
+    def add(self, triple):
+        s, p, o = triple
+        if s == self.subject:
+            self.stream.write(' ;\n    %s %s' % (
+                self._predicate(p), self._term(o)))
+        else:
+            self._end_statement()
+            self.subject = s
+            self.stream.write('\n%s %s %s' % (
+                self._term(s), self._predicate(p), self._term(o)))
+        self.count += 1
+
+    def serialize(self, destination=None, format=None, **kwargs):
+        self._end_statement()
+        super().serialize(destination, format, **kwargs)
+
+    def _end_statement(self):
+        if self.subject is not None:
+            self.stream.write(' .\n')
+            self.subject = None
+
+    def _predicate(self, iri):
+        return 'a' if iri == _RDF_TYPE else self._qname(iri)
+
+    def _term(self, term):
+        if isinstance(term, URIRef):
+            return self._qname(term)
+        if isinstance(term, Literal) and term.datatype is not None \
+                and term.language is None:
+            return '%s^^%s' % (_quote(term), self._qname(term.datatype))
+        return _term(term)
+
+    def _qname(self, iri):
+        index = max(iri.rfind('#'), iri.rfind('/')) + 1
+        prefix = self.namespaces.get(iri[:index])
+        if prefix is not None and _LOCAL_NAME.match(iri[index:]):
+            return prefix + ':' + iri[index:]
+        return '<%s>' % iri
+
+
+class WriterSerializer(Serializer):
+    """Serializes a whole rdflib Graph with one of the streaming writers,
+    for the formats that rdflib does not write for a plain Graph
+    """
+    format = None
+
+    def serialize(self, stream, base=None, encoding=None, **args):
+        writer = new_writer(self.format, stream, self.store.identifier)
+        for prefix, namespace in self.store.namespaces():
+            writer.bind(prefix, namespace)
+        writer.addN((s, p, o, None) for s, p, o in self.store)
+        writer.serialize()
+
+
+class NQuadsSerializer(WriterSerializer):
+    format = 'nquads'
+
+
+class BinarySerializer(WriterSerializer):
+    format = 'binary'
+
+
+def new_writer(format, stream, graph_name=None):
+    """Returns the streaming writer for the given output format. The graph
+    name is required by N-Quads, which writes every triple into that graph.
+    """
+    if format == 'nt':
+        return NTriplesWriter(stream)
+    elif format == 'ttl':
+        return TurtleWriter(stream)
+    elif format == 'nquads':
+        if graph_name is None:
+            raise ValueError("N-Quads output requires a graph name")
+        return NQuadsWriter(stream, graph_name)
+    elif format == 'binary':
+        from specimen2ccf.binary import BinaryWriter
+        return BinaryWriter(stream)
+    else:
+        raise ValueError("Unsupported streaming format <" + format + ">")
+
+
+_RDF_TYPE = URIRef('http://www.w3.org/1999/02/22-rdf-syntax-ns#type')
+
+_LOCAL_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_-]*$')
+
+
+def _term(term):
+    if isinstance(term, URIRef):
+        return '<%s>' % term
+    if isinstance(term, BNode):
+        return '_:%s' % term
+    if term.language is not None:
+        return '%s@%s' % (_quote(term), term.language)
+    if term.datatype is not None:
+        return '%s^^<%s>' % (_quote(term), term.datatype)
+    return _quote(term)
+
+
+def _quote(literal):
+    return '"' + literal.replace('\\', '\\\\').replace('\n', '\\n') \
+        .replace('"', '\\"').replace('\r', '\\r') + '"'
+
+
+plugin.register(PLUGINS['nquads'], Serializer, 'specimen2ccf.writer',
+                'NQuadsSerializer')
+plugin.register(PLUGINS['binary'], Serializer, 'specimen2ccf.writer',
+                'BinarySerializer')
+plugin.register(PLUGINS['binary'], Parser, 'specimen2ccf.binary',
+                'BinaryParser')
@@ -0,0 +1,47 @@
+"""Command line arguments for the tests that run the pipeline
+"""
+from argparse import Namespace
+
+# Defaults of the options of bin/specimen2ccf
+DEFAULTS = {
+    'input_file': [],
+    'ontology_iri': "https://example.org/ontology",
+    'output': None,
+    'stream_input': False,
+    'stream_output': False,
+    'format': 'ttl',
+    'compress': None,
+    'graph_iri': None,
+    'publish': None,
+    'update_endpoint': None,
+    'upload_chunk_size': 50000,
+    'on_invalid': 'fail',
+    'duplicates': None,
+    'shard_by': None,
+    'tables_dir': None,
+    'tables_format': 'arrow',
+    'batch_size': 10000,
+    'defer_indexing': False,
+    'max_memory': None,
+    'store': None,
+    'store_type': 'SQLite',
+    'incremental': False,
+    'jobs': 1,
+    'chunk_size': 50,
+    'asynchronous': False,
+    'cache_dir': None,
+    'timeout': 60,
+    'retries': 3,
+    'serve': None,
+    'stats': None,
+    'profile': None,
+    'trace_memory': False,
+    'verbose': False
+}
+
+
+def arguments(**options):
+    """Returns the parsed arguments of a command line with the given
+    options
+    """
+    return Namespace(**dict(DEFAULTS, **options))
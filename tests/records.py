@@ -0,0 +1,76 @@
+"""Small specimen records for the tests, in the shape of the HuBMAP export
+"""
+BASE = "https://example.org/hubmap/"
+
+
+def donor(n, blocks=1, sections=2, **fields):
+    """Returns a donor record with the given number of tissue blocks and
+    sections per block, each with one dataset. The given fields override
+    the ones of the donor.
+    """
+    donor_id = BASE + "donor/%d" % n
+    record = {
+        "@id": donor_id,
+        "@type": "Donor",
+        "label": "Female, Age %d" % (20 + n),
+        "description": "Donor %d" % n,
+        "link": donor_id + "/link",
+        "age": 20 + n,
+        "sex": "Female",
+        "bmi": 21.5,
+        "consortium_name": "HuBMAP",
+        "provider_name": "TMC-Stanford",
+        "samples": [_tissue_block(donor_id, b, sections)
+                    for b in range(blocks)]
+    }
+    record.update(fields)
+    return record
+
+
+def export(records):
+    return {"@context": "https://hubmap-link-api.herokuapp.com/context.jsonld",
+            "@graph": records}
+
+
+def _tissue_block(donor_id, b, sections):
+    block_id = "%s/block/%d" % (donor_id, b)
+    return {
+        "@id": block_id,
+        "@type": "Sample",
+        "sample_type": "Tissue Block",
+        "label": "Registered %d" % b,
+        "description": "10 x 10 x 10 millimeter",
+        "link": block_id + "/link",
+        "section_count": sections,
+        "section_size": 10,
+        "section_units": "millimeter",
+        "rui_location": {"@id": block_id + "/rui_location"},
+        "sections": [_tissue_section(block_id, s) for s in range(sections)],
+        "datasets": [_dataset(block_id, 0)]
+    }
+
+
+def _tissue_section(block_id, s):
+    section_id = "%s/section/%d" % (block_id, s)
+    return {
+        "@id": section_id,
+        "@type": "Sample",
+        "sample_type": "Tissue Section",
+        "label": "Section %d" % s,
+        "description": "Section of a tissue block",
+        "link": section_id + "/link",
+        "section_number": s + 1,
+        "datasets": [_dataset(section_id, 0)]
+    }
+
+
+def _dataset(sample_id, k):
+    dataset_id = "%s/dataset/%d" % (sample_id, k)
+    return {
+        "@id": dataset_id,
+        "label": "Dataset %d" % k,
+        "description": "Generated dataset",
+        "link": dataset_id + "/link",
+        "technology": "CODEX",
+        "thumbnail": dataset_id + "/thumbnail.png"
+    }
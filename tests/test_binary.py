@@ -0,0 +1,70 @@
+import io
+import unittest
+
+from rdflib import Graph, Literal, URIRef, XSD
+from rdflib.compare import isomorphic
+
+from specimen2ccf import binary
+from specimen2ccf.binary import BinaryWriter
+from specimen2ccf.ontology import SCOntology
+
+from tests.records import donor
+
+ONTOLOGY_IRI = URIRef("https://example.org/ontology")
+
+
+class BinaryTest(unittest.TestCase):
+
+    def convert(self, records, graph=None):
+        o = SCOntology.new(ONTOLOGY_IRI, graph).mutate(records)
+        o.flush()
+        return o
+
+    def write(self, records, frame_size):
+        stream = io.BytesIO()
+        writer = BinaryWriter(stream, frame_size)
+        self.convert(records, writer).serialize(stream, 'binary')
+        return stream.getvalue()
+
+    def test_round_trip(self):
+        records = [donor(n, blocks=2) for n in range(3)]
+        expected = self.convert(records).graph
+        # Small frames spread the triples and their terms over many frames
+        for frame_size in (1, 7, 65536):
+            with self.subTest(frame_size=frame_size):
+                data = self.write(records, frame_size)
+                graph = binary.load(io.BytesIO(data))
+                self.assertTrue(isomorphic(graph, expected))
+                self.assertEqual(dict(graph.namespaces())['ccf'],
+                                 dict(expected.namespaces())['ccf'])
+
+    def test_terms(self):
+        s = URIRef("https://example.org/s")
+        p = URIRef("https://example.org/p")
+        triples = [
+            (s, p, Literal("plain")),
+            (s, p, Literal("Zelle", lang='de')),
+            (s, p, Literal("10", datatype=XSD.integer)),
+            (s, p, Literal("tab\tline\n€"))
+        ]
+        stream = io.BytesIO()
+        writer = BinaryWriter(stream, frame_size=2)
+        writer.addN(triple + (None,) for triple in triples)
+        writer.serialize()
+        stream.seek(0)
+        self.assertEqual(set(binary.load(stream)), set(triples))
+
+    def test_rdflib_parser(self):
+        records = [donor(0)]
+        graph = Graph().parse(data=self.write(records, 16),
+                              format='specimen2ccf-binary')
+        self.assertTrue(isomorphic(graph, self.convert(records).graph))
+
+    def test_truncated_document(self):
+        data = self.write([donor(0)], 16)
+        with self.assertRaises(ValueError):
+            binary.load(io.BytesIO(data[:-3]))
+
+    def test_not_a_binary_document(self):
+        with self.assertRaises(ValueError):
+            binary.load(io.BytesIO(b'@prefix ccf: <http://purl.org/ccf/> .'))
@@ -0,0 +1,62 @@
+import unittest
+
+from rdflib import Literal, URIRef
+from rdflib.namespace import RDFS
+
+from specimen2ccf.dedup import EntityIndex, ScreenedIndex, \
+    DuplicateEntityError
+from specimen2ccf.ontology import SCOntology
+
+from tests.records import donor
+
+ONTOLOGY_IRI = URIRef("https://example.org/ontology")
+
+
+class EntityIndexTest(unittest.TestCase):
+
+    def convert(self, records, index):
+        return SCOntology.new(ONTOLOGY_IRI, index=index).mutate(records)
+
+    def test_repeats_are_skipped(self):
+        index = EntityIndex('first')
+        o = self.convert([donor(0), donor(1), donor(0)], index)
+        expected = SCOntology.new(ONTOLOGY_IRI).mutate([donor(0), donor(1)])
+        self.assertEqual(set(o.graph), set(expected.graph))
+        # The donor, its tissue block, two sections and three datasets
+        self.assertEqual(index.repeats, 7)
+        self.assertEqual(index.conflicts, 0)
+
+    def test_first(self):
+        index = EntityIndex('first')
+        o = self.convert([donor(0), donor(0, description="Second")], index)
+        self.assertEqual(index.conflicts, 1)
+        self.assertEqual(self.descriptions(o), {"Donor 0"})
+
+    def test_merge(self):
+        index = EntityIndex('merge')
+        o = self.convert([donor(0), donor(0, description="Second")], index)
+        self.assertEqual(index.conflicts, 1)
+        self.assertEqual(self.descriptions(o), {"Donor 0", "Second"})
+
+    def test_error(self):
+        with self.assertRaises(DuplicateEntityError):
+            self.convert([donor(0), donor(0, description="Second")],
+                         EntityIndex('error'))
+
+    def test_unsupported_policy(self):
+        with self.assertRaises(ValueError):
+            EntityIndex('last')
+
+    def test_screened_index_replays_decisions(self):
+        records = [donor(0), donor(0, description="Second")]
+        index = EntityIndex('first')
+        decisions = [admitted for record in records
+                     for admitted in index.screen(record)]
+        o = self.convert(records, ScreenedIndex(decisions))
+        expected = self.convert(records, EntityIndex('first'))
+        self.assertEqual(set(o.graph), set(expected.graph))
+
+    def descriptions(self, o):
+        iri = URIRef(donor(0)['@id'])
+        return {str(value) for value in o.graph.objects(iri, RDFS.comment)
+                if isinstance(value, Literal)}
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from specimen2ccf.fetch import HTTPCache, new_session, new_fetch, fetch_all
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """Serves a versioned export with an ETag and answers a conditional
+    request for the current version with 304 Not Modified. The body is cut
+    short if the server truncates it.
+    """
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get('If-None-Match'))
+        etag = '"v%d"' % server.version
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = ('{"@graph": [], "version": %d}' % server.version).encode()
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if server.truncate:
+            # The connection drops halfway through the body
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('localhost', 0), ExportHandler)
+        self.server.version = 1
+        self.server.truncate = False
+        self.server.requests = []
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = 'http://localhost:%d/export.json' % self.server.server_port
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = HTTPCache(tmp.name)
+        self.session = new_session(retries=0)
+        self.addCleanup(self.session.close)
+
+    def fetch(self):
+        with open(self.cache.fetch(self.session, self.url)) as f:
+            return f.read()
+
+    def test_revalidation(self):
+        self.assertIn('"version": 1', self.fetch())
+        path = self.cache.fetch(self.session, self.url)
+        mtime = os.stat(path).st_mtime_ns
+        self.assertIn('"version": 1', self.fetch())
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        self.assertEqual(self.server.requests, [None, '"v1"', '"v1"'])
+
+        # A changed export is downloaded again, along with its new ETag
+        self.server.version = 2
+        self.assertIn('"version": 2', self.fetch())
+        self.fetch()
+        self.assertEqual(self.server.requests[-2:], ['"v1"', '"v2"'])
+        self.assertEqual(sorted(name.endswith('.part') for name
+                                in os.listdir(self.cache.directory)),
+                         [False, False])
+
+    def test_failed_download(self):
+        self.server.truncate = True
+        with self.assertRaises(Exception):
+            self.fetch()
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+        self.server.truncate = False
+        self.assertIn('"version": 1', self.fetch())
+        # A failed update leaves no part file, and the next run downloads
+        # the changed export instead of revalidating the stale copy
+        self.server.version = 2
+        self.server.truncate = True
+        with self.assertRaises(Exception):
+            self.fetch()
+        self.server.truncate = False
+        self.assertIn('"version": 2', self.fetch())
+        self.assertEqual(len(os.listdir(self.cache.directory)), 2)
+
+    def test_fetch_all(self):
+        paths = fetch_all([self.url],
+                          new_fetch(self.cache, self.session))
+        self.assertEqual(list(paths), [self.url])
+        self.assertTrue(os.path.exists(paths[self.url]))
@@ -0,0 +1,73 @@
+import sys
+import unittest
+
+from rdflib import URIRef
+
+from specimen2ccf.hierarchy import walk, DONOR, TISSUE_BLOCK, \
+    TISSUE_SECTION, DATASET
+
+from tests.records import donor
+
+
+class WalkTest(unittest.TestCase):
+
+    def entities(self, record):
+        return [(entity.kind, entity.iri, entity.parent)
+                for entity in walk(record)]
+
+    def test_document_order_and_parents(self):
+        record = donor(0, sections=2)
+        block = record['samples'][0]
+        sections = block['sections']
+        self.assertEqual(self.entities(record), [
+            (DONOR, record['@id'], None),
+            (TISSUE_BLOCK, block['@id'], record['@id']),
+            (TISSUE_SECTION, sections[0]['@id'], block['@id']),
+            (DATASET, sections[0]['datasets'][0]['@id'], sections[0]['@id']),
+            (TISSUE_SECTION, sections[1]['@id'], block['@id']),
+            (DATASET, sections[1]['datasets'][0]['@id'], sections[1]['@id']),
+            (DATASET, block['datasets'][0]['@id'], block['@id'])
+        ])
+        self.assertEqual({entity.donor for entity in walk(record)},
+                         {record['@id']})
+
+    def test_sections_belong_to_the_preceding_block(self):
+        record = donor(0, blocks=2, sections=1)
+        first, second = record['samples']
+        # A flat export lists the sections next to their blocks
+        record['samples'] = [first, first.pop('sections')[0],
+                             second, second.pop('sections')[0],
+                             {"@id": "other", "sample_type": "Organ"}]
+        parents = {entity.iri: entity.parent for entity in walk(record)
+                   if entity.kind == TISSUE_SECTION}
+        self.assertEqual(parents, {
+            record['samples'][1]['@id']: first['@id'],
+            record['samples'][3]['@id']: second['@id']
+        })
+        self.assertNotIn('other', [entity.iri for entity in walk(record)])
+
+    def test_missing_tissue_block(self):
+        record = donor(0)
+        record['samples'] = record['samples'][0]['sections']
+        with self.assertRaises(ValueError):
+            list(walk(record))
+
+    def test_deep_nesting(self):
+        record = donor(0, sections=1)
+        section = record['samples'][0]['sections'][0]
+        depth = sys.getrecursionlimit() * 2
+        for level in range(depth):
+            nested = dict(section, **{'@id': "nested/%d" % level,
+                                      'datasets': []})
+            section['samples'] = [nested]
+            section = nested
+        sections = [entity for entity in walk(record)
+                    if entity.kind == TISSUE_SECTION]
+        self.assertEqual(len(sections), depth + 1)
+        self.assertEqual(sections[-1].parent, "nested/%d" % (depth - 2))
+
+    def test_iri_function(self):
+        entities = list(walk(donor(0), URIRef))
+        self.assertTrue(all(isinstance(entity.iri, URIRef)
+                            for entity in entities))
+        self.assertIsInstance(entities[1].parent, URIRef)
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from rdflib import Graph, URIRef
+from rdflib.compare import isomorphic
+
+import specimen2ccf.store  # noqa: F401, registers the SQLite store
+from specimen2ccf.incremental import Manifest, changed_records
+from specimen2ccf.ontology import SCOntology
+
+from tests.records import donor
+
+ONTOLOGY_IRI = URIRef("https://example.org/ontology")
+
+
+class IncrementalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.manifest_path = os.path.join(self.tmp.name, 'manifest.json')
+
+    def rebuild(self, graph, records):
+        """Patches the graph with the records that changed since the saved
+        manifest, like run_incremental
+        """
+        previous = Manifest.load(self.manifest_path)
+        current = Manifest()
+        o = SCOntology.new(ONTOLOGY_IRI, graph)
+        o.mutate(changed_records(records, previous, current, o.retract))
+        o.flush()
+        current.save(self.manifest_path)
+        return current
+
+    def full(self, records):
+        return SCOntology.new(ONTOLOGY_IRI).mutate(records).graph
+
+    def check_retract_and_readd(self, graph):
+        donors = [donor(n) for n in range(3)]
+        self.rebuild(graph, donors)
+        self.assertTrue(isomorphic(graph, self.full(donors)))
+
+        # Donor 0 changed, donor 1 was removed and donor 3 was added
+        changed = donor(0, blocks=2, label="Male, Age 20", sex="Male")
+        second = [changed, donor(2), donor(3)]
+        manifest = self.rebuild(graph, second)
+        self.assertTrue(isomorphic(graph, self.full(second)))
+        self.assertEqual(set(manifest.donors),
+                         {record['@id'] for record in second})
+
+        # Donor 1 is back
+        third = [changed, donor(1), donor(2), donor(3)]
+        self.rebuild(graph, third)
+        self.assertTrue(isomorphic(graph, self.full(third)))
+
+    def test_in_memory_graph(self):
+        self.check_retract_and_readd(Graph(identifier=ONTOLOGY_IRI))
+
+    def test_sqlite_store(self):
+        graph = Graph(store='SQLite', identifier=ONTOLOGY_IRI)
+        graph.open(os.path.join(self.tmp.name, 'specimens.db'), create=True)
+        try:
+            self.check_retract_and_readd(graph)
+        finally:
+            graph.close(commit_pending_transaction=True)
+
+    def test_sqlite_store_is_reopened(self):
+        path = os.path.join(self.tmp.name, 'specimens.db')
+        donors = [donor(n) for n in range(2)]
+        graph = Graph(store='SQLite', identifier=ONTOLOGY_IRI)
+        graph.open(path, create=True)
+        self.rebuild(graph, donors)
+        graph.close(commit_pending_transaction=True)
+
+        graph = Graph(store='SQLite', identifier=ONTOLOGY_IRI)
+        graph.open(path)
+        try:
+            self.rebuild(graph, donors[:1])
+            self.assertTrue(isomorphic(graph, self.full(donors[:1])))
+        finally:
+            graph.close(commit_pending_transaction=True)
+
+    def test_unchanged_donors_are_skipped(self):
+        donors = [donor(n) for n in range(3)]
+        previous = Manifest()
+        list(changed_records(donors, Manifest(), previous, lambda iris: 0))
+        retracted = []
+        current = Manifest()
+        records = list(changed_records(
+            [donors[0], donor(1, description="Changed")], previous, current,
+            retracted.extend))
+        self.assertEqual([record['@id'] for record in records],
+                         [donors[1]['@id']])
+        self.assertIn(donors[1]['@id'], retracted)
+        self.assertIn(donors[2]['@id'], retracted)
+        self.assertNotIn(donors[0]['@id'], retracted)
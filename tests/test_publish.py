@@ -0,0 +1,137 @@
+import re
+import threading
+import unittest
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from rdflib import Graph, URIRef
+
+from specimen2ccf.fetch import new_session
+from specimen2ccf.ontology import SCOntology
+from specimen2ccf.publish import GraphStore
+
+from tests.records import donor
+
+ONTOLOGY_IRI = URIRef("https://example.org/ontology")
+
+_MOVE = re.compile(r'^MOVE GRAPH <([^>]*)> TO GRAPH <([^>]*)>$')
+
+
+class GraphStoreHandler(BaseHTTPRequestHandler):
+    """Serves named graphs of N-Triples lines over the SPARQL 1.1 Graph
+    Store Protocol and applies MOVE operations posted to /update, unless
+    the server ignores them
+    """
+    def do_HEAD(self):
+        self._respond(200 if self._graph() in self.server.graphs else 404)
+
+    def do_PUT(self):
+        lines = self._lines()
+        with self.server.lock:
+            self.server.graphs[self._graph()] = lines
+        self._respond(201)
+
+    def do_POST(self):
+        if urlparse(self.path).path == '/update':
+            return self._update(self._body().decode('utf-8'))
+        lines = self._lines()
+        if self.server.fail_uploads:
+            return self._respond(500)
+        with self.server.lock:
+            self.server.graphs.setdefault(self._graph(), set()).update(lines)
+        self._respond(204)
+
+    def do_DELETE(self):
+        with self.server.lock:
+            found = self.server.graphs.pop(self._graph(), None)
+        self._respond(404 if found is None else 204)
+
+    def log_message(self, *args):
+        pass
+
+    def _update(self, operation):
+        self.server.updates.append(operation)
+        match = _MOVE.match(operation)
+        if match is None:
+            return self._respond(400)
+        if not self.server.ignore_updates:
+            source, target = match.groups()
+            with self.server.lock:
+                self.server.graphs[target] = self.server.graphs.pop(source)
+        self._respond(204)
+
+    def _graph(self):
+        return parse_qs(urlparse(self.path).query)['graph'][0]
+
+    def _body(self):
+        return self.rfile.read(int(self.headers['Content-Length']))
+
+    def _lines(self):
+        return set(self._body().decode('utf-8').splitlines())
+
+    def _respond(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class GraphStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        server = self.server = ThreadingHTTPServer(('localhost', 0),
+                                                   GraphStoreHandler)
+        server.graphs = {}
+        server.updates = []
+        server.lock = threading.Lock()
+        server.ignore_updates = False
+        server.fail_uploads = False
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base = 'http://localhost:%d' % server.server_port
+        self.endpoint = base + '/store'
+        self.update_endpoint = base + '/update'
+        session = new_session(retries=0)
+        self.addCleanup(session.close)
+        self.store = GraphStore(self.endpoint, self.update_endpoint, session,
+                                chunk_size=7, uploads=2)
+        self.graph = SCOntology.new(ONTOLOGY_IRI).mutate(
+            [donor(n) for n in range(3)]).graph
+
+    def loaded(self, graph_iri):
+        data = '\n'.join(self.server.graphs[graph_iri])
+        return Graph().parse(data=data, format='nt')
+
+    def test_swap(self):
+        graph_iri = str(ONTOLOGY_IRI)
+        self.server.graphs[graph_iri] = {'<urn:a> <urn:b> <urn:c> .'}
+        for _ in range(2):
+            count = self.store.load(self.graph, graph_iri)
+            self.assertEqual(count, len(self.graph))
+            self.assertEqual(list(self.server.graphs), [graph_iri])
+            self.assertEqual(set(self.loaded(graph_iri)), set(self.graph))
+        self.assertEqual(len(self.server.updates), 2)
+
+    def test_ignored_move_fails(self):
+        self.server.ignore_updates = True
+        with self.assertRaises(ValueError):
+            self.store.load(self.graph, str(ONTOLOGY_IRI))
+        self.assertEqual(self.server.graphs, {})
+
+    def test_failed_upload_removes_staging_graph(self):
+        self.server.fail_uploads = True
+        with self.assertRaises(Exception):
+            self.store.load(self.graph, str(ONTOLOGY_IRI))
+        self.assertEqual(self.server.graphs, {})
+        self.assertEqual(self.server.updates, [])
+
+    def test_without_update_endpoint(self):
+        store = GraphStore(self.endpoint, chunk_size=7)
+        self.addCleanup(store.session.close)
+        store.load(self.graph, str(ONTOLOGY_IRI))
+        self.assertEqual(set(self.loaded(str(ONTOLOGY_IRI))),
+                         set(self.graph))
+        self.assertEqual(self.server.updates, [])
@@ -0,0 +1,62 @@
+import io
+import json
+import unittest
+
+from specimen2ccf.reader import RecordReader
+
+from tests.records import donor, export
+
+
+class RecordReaderTest(unittest.TestCase):
+
+    def read(self, text, chunk_size):
+        return list(RecordReader(io.StringIO(text), chunk_size))
+
+    def test_graph_at_every_chunk_size(self):
+        records = [donor(n, blocks=2) for n in range(3)]
+        text = json.dumps(export(records), indent=1)
+        for chunk_size in (1, 2, 3, 7, 64, 65536):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.read(text, chunk_size), records)
+
+    def test_bare_array(self):
+        records = [donor(n) for n in range(2)]
+        for chunk_size in (1, 5):
+            self.assertEqual(self.read(json.dumps(records), chunk_size),
+                             records)
+
+    def test_keys_around_graph_are_skipped(self):
+        text = ('{"@context": {"a": [1, {"b": "]}"}]}, "@graph": '
+                '[{"n": 1}, {"n": 2}], "extra": [3, 4]}')
+        for chunk_size in (1, 4):
+            self.assertEqual(self.read(text, chunk_size),
+                             [{"n": 1}, {"n": 2}])
+
+    def test_values_split_across_chunks(self):
+        # Numbers and literals that end a chunk may continue in the next
+        records = [12345678, -0.25e10, True, None, "café \\\" ]",
+                   {"s": "😀"}]
+        text = '[ ' + ' ,\n '.join(json.dumps(r) for r in records) + ' ]'
+        for chunk_size in range(1, 9):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.read(text, chunk_size), records)
+
+    def test_empty_graph(self):
+        self.assertEqual(self.read('{"@graph": [ ]}', 1), [])
+        self.assertEqual(self.read(' [] ', 1), [])
+
+    def test_missing_graph(self):
+        with self.assertRaises(KeyError):
+            self.read('{"@context": {}}', 2)
+
+    def test_truncated_input(self):
+        with self.assertRaises(ValueError):
+            self.read('{"@graph": [{"n": 1}, {"n"', 3)
+
+    def test_missing_delimiter(self):
+        with self.assertRaises(ValueError):
+            self.read('[{"n": 1} {"n": 2}]', 2)
+
+    def test_not_a_container(self):
+        with self.assertRaises(ValueError):
+            self.read('"records"', 2)
@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+import unittest
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from specimen2ccf import pipeline
+from specimen2ccf.sharding import ShardIndex, shard_key, INDEX_FILE, UNKNOWN
+
+from tests.arguments import arguments
+from tests.records import donor, export
+
+
+class ShardIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def test_shard_key(self):
+        self.assertEqual(shard_key(donor(0), 'consortium'), "HuBMAP")
+        self.assertEqual(shard_key(donor(0), 'provider'), "TMC-Stanford")
+        record = donor(0, provider_name=None, provider_uuid="1234")
+        self.assertEqual(shard_key(record, 'provider'), "1234")
+        record = donor(0, provider_name="", consortium_name=None)
+        self.assertEqual(shard_key(record, 'provider'), UNKNOWN)
+        self.assertEqual(shard_key(record, 'consortium'), UNKNOWN)
+
+    def test_file_names(self):
+        shards = ShardIndex(self.directory, 'provider', 'nt', 'gzip')
+        names = [os.path.basename(shards.path(key))
+                 for key in ("TMC Stanford", "TMC/Stanford", "../..", "")]
+        self.assertEqual(names, ["TMC-Stanford.nt.gz", "TMC-Stanford-2.nt.gz",
+                                 "unknown.nt.gz", "unknown-2.nt.gz"])
+        self.assertEqual(shards.path("TMC/Stanford"),
+                         os.path.join(self.directory, names[1]))
+
+    def test_save(self):
+        shards = ShardIndex(self.directory, 'consortium', 'ttl')
+        shards.path("KPMP")
+        shards.count("KPMP", donors=2, triples=10)
+        shards.count("KPMP", donors=1)
+        shards.save()
+        with open(os.path.join(self.directory, INDEX_FILE)) as f:
+            self.assertEqual(json.load(f), {
+                'shard_by': 'consortium',
+                'format': 'ttl',
+                'compression': None,
+                'shards': [{'key': "KPMP", 'path': "KPMP.ttl", 'donors': 3,
+                            'triples': 10}]
+            })
+
+    def test_unsupported_key(self):
+        with self.assertRaises(ValueError):
+            ShardIndex(self.directory, 'organ', 'ttl')
+
+
+class RunShardedTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        consortia = ["HuBMAP", "GTEx", "KPMP", "GTEx", "HuBMAP"]
+        self.records = [donor(n, consortium_name=consortium)
+                        for n, consortium in enumerate(consortia)]
+        self.input = os.path.join(self.tmp, 'input.json')
+        with open(self.input, 'w') as f:
+            json.dump(export(self.records), f)
+
+    def run_pipeline(self, name, **options):
+        output = os.path.join(self.tmp, name)
+        pipeline.run(arguments(input_file=[self.input], output=output,
+                               **options))
+        return output
+
+    def load_shards(self, directory, format):
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            index = json.load(f)
+        graph = Graph()
+        for shard in index['shards']:
+            shard_graph = Graph().parse(os.path.join(directory,
+                                                     shard['path']),
+                                        format=format)
+            self.assertEqual(len(shard_graph), shard['triples'])
+            graph += shard_graph
+        return index, graph
+
+    def test_shards_add_up_to_the_whole_output(self):
+        expected = Graph().parse(self.run_pipeline('all.nt', format='nt'),
+                                 format='nt')
+        for i, options in enumerate(({}, {'jobs': 2},
+                                     {'stream_output': True})):
+            with self.subTest(**options):
+                directory = self.run_pipeline('shards-%d' % i, format='nt',
+                                              shard_by='consortium',
+                                              **options)
+                index, graph = self.load_shards(directory, 'nt')
+                self.assertEqual(
+                    {shard['key']: shard['donors']
+                     for shard in index['shards']},
+                    {"HuBMAP": 2, "GTEx": 2, "KPMP": 1})
+                self.assertTrue(isomorphic(graph, expected))
+
+    def test_invalid_records_are_left_out(self):
+        self.records.append(donor(9, consortium_name="Other", label=None))
+        with open(self.input, 'w') as f:
+            json.dump(export(self.records), f)
+        directory = self.run_pipeline('shards', format='nt',
+                                      shard_by='consortium',
+                                      on_invalid='skip')
+        index, _ = self.load_shards(directory, 'nt')
+        self.assertNotIn("Other", [shard['key'] for shard in index['shards']])
+
+    def test_output_directory_is_required(self):
+        with self.assertRaises(ValueError):
+            pipeline.run(arguments(input_file=[self.input],
+                                   shard_by='consortium'))
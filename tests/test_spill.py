@@ -0,0 +1,99 @@
+import io
+import os
+import unittest
+
+from unittest import mock
+from rdflib import Graph, Literal, URIRef
+from rdflib.compare import isomorphic
+
+from specimen2ccf import pipeline, spill
+from specimen2ccf.ontology import SCOntology
+from specimen2ccf.spill import SpillingGraph, parse_size
+
+from tests.arguments import arguments
+from tests.records import donor
+
+ONTOLOGY_IRI = URIRef("https://example.org/ontology")
+
+
+class SpillingGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        # Checks the memory use after every triple, spills runs of a few
+        # triples over a zero budget and compacts every three runs
+        for name, value in (('CHECK_INTERVAL', 1), ('MIN_RUN_SIZE', 5),
+                            ('BLOCK_SIZE', 4), ('MERGE_FAN_IN', 3)):
+            patcher = mock.patch.object(spill, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def new_graph(self):
+        graph = SpillingGraph(0)
+        self.addCleanup(graph.close)
+        return graph
+
+    def test_merge_matches_in_memory_graph(self):
+        records = [donor(n, blocks=2) for n in range(4)]
+        graph = self.new_graph()
+        o = SCOntology.new(ONTOLOGY_IRI, graph).mutate(records)
+        o.flush()
+        self.assertGreater(graph.spills, spill.MERGE_FAN_IN)
+        self.assertLessEqual(len(graph.runs), spill.MERGE_FAN_IN)
+
+        expected = SCOntology.new(ONTOLOGY_IRI).mutate(records).graph
+        triples = list(graph)
+        self.assertEqual(len(triples), len(set(triples)))
+        self.assertEqual(set(triples), set(expected))
+
+        stream = io.BytesIO()
+        o.serialize(stream, 'nt')
+        self.assertTrue(isomorphic(Graph().parse(data=stream.getvalue(),
+                                                 format='nt'), expected))
+
+    def test_duplicates_across_runs(self):
+        graph = self.new_graph()
+        triples = [(URIRef("https://example.org/s%d" % (i % 7)),
+                    URIRef("https://example.org/p"), Literal(i % 11))
+                   for i in range(200)]
+        for triple in triples:
+            graph.add(triple)
+        self.assertEqual(list(graph), sorted(set(triples), key=_key))
+
+    def test_close_removes_runs(self):
+        graph = SpillingGraph(0)
+        for i in range(20):
+            graph.add((URIRef("https://example.org/s%d" % i),
+                       URIRef("https://example.org/p"), Literal(i)))
+        directory = graph.tmp.name
+        self.assertTrue(os.listdir(directory))
+        graph.close()
+        self.assertFalse(os.path.exists(directory))
+
+
+class MaxMemoryTest(unittest.TestCase):
+
+    def test_streamed_output(self):
+        with self.assertRaises(ValueError):
+            pipeline.check_output(arguments(max_memory='1G',
+                                            stream_output=True))
+
+    def test_json_ld(self):
+        with self.assertRaises(ValueError):
+            pipeline.open_graph(arguments(max_memory='1G', format='json-ld'))
+
+
+class ParseSizeTest(unittest.TestCase):
+
+    def test_units(self):
+        self.assertEqual(parse_size('512'), 512)
+        self.assertEqual(parse_size('1.5K'), 1536)
+        self.assertEqual(parse_size('512M'), 512 << 20)
+        self.assertEqual(parse_size('2GiB'), 2 << 30)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_size('lots')
+
+
+def _key(triple):
+    return tuple(spill.encode_term(term) for term in triple)
@@ -0,0 +1,97 @@
+import tempfile
+import unittest
+
+from rdflib import URIRef
+
+from specimen2ccf.ontology import SCOntology
+from specimen2ccf.tables import SpecimenTables, SCHEMAS
+
+from tests.records import donor
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+ONTOLOGY_IRI = URIRef("https://example.org/ontology")
+
+
+class SpecimenTablesTest(unittest.TestCase):
+
+    def convert(self, records, tables):
+        SCOntology.new(ONTOLOGY_IRI, tables=tables).mutate(records)
+        return tables
+
+    def test_rows(self):
+        record = donor(0, blocks=2)
+        rows = self.convert([record], SpecimenTables()).rows
+        self.assertEqual({name: len(rows[name]) for name in SCHEMAS},
+                         {'donors': 1, 'tissue_blocks': 2,
+                          'tissue_sections': 4, 'datasets': 6})
+        block = record['samples'][1]
+        self.assertEqual(_plain(rows['tissue_blocks'][1]), (
+            block['@id'], record['@id'], block['rui_location']['@id'],
+            block['label'], block['description'], block['link'], 2, 10,
+            'millimeter'))
+        section = block['sections'][0]
+        self.assertEqual(_plain(rows['tissue_sections'][2][:3]),
+                         (section['@id'], block['@id'], record['@id']))
+        datasets = {row[0]: _plain(row[:3]) for row in rows['datasets']}
+        dataset_id = block['datasets'][0]['@id']
+        self.assertEqual(datasets[dataset_id],
+                         (dataset_id, block['@id'], record['@id']))
+
+    def test_extend(self):
+        records = [donor(n) for n in range(3)]
+        tables = SpecimenTables()
+        for record in records:
+            tables.extend(self.convert([record], SpecimenTables()).rows)
+        self.assertEqual(tables.rows,
+                         self.convert(records, SpecimenTables()).rows)
+
+    @unittest.skipIf(pyarrow is None, "requires pyarrow")
+    def test_arrow_and_parquet_files(self):
+        records = [donor(n, blocks=2) for n in range(5)]
+        expected = self.convert(records, SpecimenTables()).rows
+        for format in ('arrow', 'parquet'):
+            with self.subTest(format=format), \
+                    tempfile.TemporaryDirectory() as directory:
+                # Writes the rows in several record batches
+                tables = SpecimenTables(directory, format, batch_size=3)
+                self.convert(records, tables).close()
+                for name, columns in SCHEMAS.items():
+                    table = self.read(directory, name, format)
+                    self.assertEqual(table.column_names,
+                                     [column for column, _ in columns])
+                    self.assertEqual(
+                        [tuple(row.values()) for row in table.to_pylist()],
+                        [_plain(row) for row in expected[name]])
+
+    @unittest.skipIf(pyarrow is None, "requires pyarrow")
+    def test_empty_tables(self):
+        with tempfile.TemporaryDirectory() as directory:
+            SpecimenTables(directory).close()
+            for name in SCHEMAS:
+                self.assertEqual(self.read(directory, name, 'arrow')
+                                 .num_rows, 0)
+
+    def read(self, directory, name, format):
+        path = '%s/%s.%s' % (directory, name, format)
+        if format == 'parquet':
+            return pyarrow.parquet.read_table(path)
+        with pyarrow.memory_map(path) as source:
+            return pyarrow.ipc.open_file(source).read_all()
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            SpecimenTables(tempfile.gettempdir(), 'csv')
+
+
+def _plain(row):
+    """Returns the row with the IRIs of the parents as plain strings, the
+    way they are written to the files
+    """
+    return tuple(str(value) if isinstance(value, URIRef) else value
+                 for value in row)
@@ -0,0 +1,109 @@
+import pickle
+import unittest
+
+from rdflib import Literal, URIRef, XSD
+
+from specimen2ccf.namespace import CCF
+from specimen2ccf.ontology import SCOntology
+from specimen2ccf.validation import InvalidRecordError, validate, SKIP
+
+from tests.records import donor
+
+ONTOLOGY_IRI = URIRef("https://example.org/ontology")
+
+
+class ValidateTest(unittest.TestCase):
+
+    def test_valid_record(self):
+        self.assertEqual(validate(donor(0, blocks=2)), [])
+
+    def test_not_a_donor(self):
+        self.assertEqual(validate([]), [('$', "expected an object")])
+        self.assertEqual(validate(donor(0, **{'@type': "Sample"})),
+                         [("$['@type']", "expected 'Donor'")])
+
+    def test_missing_and_mistyped_fields(self):
+        record = donor(0, age="old", samples={})
+        del record['label']
+        self.assertEqual(validate(record), [
+            ('$.label', "missing"),
+            ('$.age', "expected an integer"),
+            ('$.samples', "expected an array")
+        ])
+
+    def test_errors_below_the_donor(self):
+        record = donor(0)
+        block = record['samples'][0]
+        block['rui_location'] = "nowhere"
+        block['sections'][1]['section_number'] = None
+        block['datasets'].append("dataset")
+        del block['sections'][0]['datasets'][0]['technology']
+        self.assertEqual(sorted(validate(record)), sorted([
+            ('$.samples[0].rui_location', "expected an object with an @id"),
+            ('$.samples[0].datasets[1]', "expected an object"),
+            ('$.samples[0].sections[1].section_number', "missing"),
+            ('$.samples[0].sections[0].datasets[0].technology', "missing")
+        ]))
+
+    def test_tissue_section_without_tissue_block(self):
+        record = donor(0)
+        record['samples'] = record['samples'][0]['sections']
+        self.assertEqual(validate(record), [
+            ('$.samples[0]', "tissue section has missing tissue block"),
+            ('$.samples[1]', "tissue section has missing tissue block")
+        ])
+
+    def test_missing_sample_type(self):
+        record = donor(0)
+        del record['samples'][0]['sample_type']
+        self.assertEqual(validate(record),
+                         [('$.samples[0].sample_type', "missing")])
+
+    def test_coercion(self):
+        record = donor(0, age="42", bmi="21.5")
+        record['samples'][0]['section_size'] = "10"
+        record['samples'][0]['section_count'] = 2.0
+        self.assertEqual(validate(record), [])
+        self.assertEqual(record['age'], 42)
+        self.assertEqual(record['bmi'], 21.5)
+        self.assertEqual(record['samples'][0]['section_size'], 10)
+        self.assertEqual(record['samples'][0]['section_count'], 2)
+
+    def test_fractional_integer(self):
+        record = donor(0)
+        record['samples'][0]['section_size'] = 10.5
+        self.assertEqual(validate(record), [
+            ('$.samples[0].section_size', "expected an integer")
+        ])
+
+
+class OnInvalidTest(unittest.TestCase):
+
+    def invalid(self):
+        return donor(1, label=None)
+
+    def test_fail(self):
+        o = SCOntology.new(ONTOLOGY_IRI)
+        with self.assertRaises(InvalidRecordError) as context:
+            o.mutate([donor(0), self.invalid()])
+        error = context.exception
+        self.assertEqual(error.donor_id, self.invalid()['@id'])
+        self.assertEqual(error.errors, [('$.label', "missing")])
+        # Raised in a worker process, the error reaches the parent intact
+        copy = pickle.loads(pickle.dumps(error))
+        self.assertEqual((copy.donor_id, copy.errors),
+                         (error.donor_id, error.errors))
+
+    def test_skip(self):
+        o = SCOntology.new(ONTOLOGY_IRI, on_invalid=SKIP)
+        o = o.mutate([donor(0), self.invalid()])
+        expected = SCOntology.new(ONTOLOGY_IRI).mutate([donor(0)])
+        self.assertEqual(set(o.graph), set(expected.graph))
+
+    def test_coerced_literal(self):
+        record = donor(0)
+        record['samples'][0]['section_size'] = "10"
+        o = SCOntology.new(ONTOLOGY_IRI).mutate([record])
+        block_iri = URIRef(record['samples'][0]['@id'])
+        self.assertEqual(list(o.graph.objects(block_iri, CCF.section_size)),
+                         [Literal("10", datatype=XSD.integer)])
@@ -0,0 +1,89 @@
+import io
+import unittest
+
+from rdflib import ConjunctiveGraph, Graph, Literal, URIRef, XSD
+from rdflib.compare import isomorphic
+from rdflib.namespace import RDF
+
+from specimen2ccf.ontology import SCOntology
+from specimen2ccf.writer import TripleWriter, NTriplesWriter, \
+    NQuadsWriter, TurtleWriter, new_writer
+
+from tests.records import donor
+
+ONTOLOGY_IRI = URIRef("https://example.org/ontology")
+EX = "https://example.org/"
+
+
+class WriterTest(unittest.TestCase):
+
+    def write(self, writer_class, triples, namespaces=(), *args):
+        stream = io.BytesIO()
+        writer = writer_class(stream, *args)
+        for prefix, namespace in namespaces:
+            writer.bind(prefix, namespace)
+        writer.addN(triple + (None,) for triple in triples)
+        writer.serialize()
+        self.assertEqual(len(writer), len(triples))
+        return stream.getvalue().decode('utf-8')
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            TripleWriter(io.BytesIO())
+
+    def test_ntriples(self):
+        s = URIRef(EX + "s")
+        p = URIRef(EX + "p")
+        triples = [(s, p, Literal('quote " and \\ backslash\r\n')),
+                   (s, p, Literal("Zelle", lang='de')),
+                   (s, p, Literal("10", datatype=XSD.integer)),
+                   (s, p, URIRef(EX + "o"))]
+        text = self.write(NTriplesWriter, triples)
+        self.assertEqual(text.splitlines()[0],
+                         '<%ss> <%sp> "quote \\" and \\\\ backslash\\r\\n" .'
+                         % (EX, EX))
+        self.assertEqual(set(Graph().parse(data=text, format='nt')),
+                         set(triples))
+
+    def test_nquads(self):
+        s = URIRef(EX + "s")
+        triples = [(s, URIRef(EX + "p"), Literal("o"))]
+        text = self.write(NQuadsWriter, triples, (), URIRef(EX + "g"))
+        graph = ConjunctiveGraph()
+        graph.parse(data=text, format='nquads')
+        self.assertEqual(set(graph.get_context(URIRef(EX + "g"))),
+                         set(triples))
+
+    def test_turtle_groups_statements_by_subject(self):
+        s = URIRef(EX + "s")
+        t = URIRef(EX + "t")
+        triples = [(s, RDF.type, URIRef(EX + "Donor")),
+                   (s, URIRef(EX + "p"), Literal("1", datatype=XSD.integer)),
+                   (t, URIRef(EX + "p"), Literal("line\nbreak")),
+                   (s, URIRef(EX + "p"), URIRef(EX + "not/a/local:name"))]
+        text = self.write(TurtleWriter, triples, [('ex', EX), ('xsd', XSD)])
+        self.assertEqual(text, (
+            '@prefix ex: <%s> .\n'
+            '@prefix xsd: <%s> .\n'
+            '\nex:s a ex:Donor ;\n'
+            '    ex:p "1"^^xsd:integer .\n'
+            '\nex:t ex:p "line\\nbreak" .\n'
+            '\nex:s ex:p <%snot/a/local:name> .\n') % (EX, XSD, EX))
+        self.assertEqual(set(Graph().parse(data=text, format='turtle')),
+                         set(triples))
+
+    def test_ontology(self):
+        records = [donor(n, blocks=2) for n in range(2)]
+        expected = SCOntology.new(ONTOLOGY_IRI).mutate(records).graph
+        for format, syntax in (('nt', 'nt'), ('ttl', 'turtle')):
+            with self.subTest(format=format):
+                stream = io.BytesIO()
+                writer = new_writer(format, stream)
+                o = SCOntology.new(ONTOLOGY_IRI, writer).mutate(records)
+                o.serialize(stream, format)
+                graph = Graph().parse(data=stream.getvalue(), format=syntax)
+                self.assertTrue(isomorphic(graph, expected))
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            new_writer('json-ld', io.BytesIO())